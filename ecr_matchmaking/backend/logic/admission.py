@@ -0,0 +1,5 @@
+def get_retry_after(queued_players: int, min_retry_after: float, max_retry_after: float, queue_scale: int):
+    """Seconds client should wait before the next queue request: grows linearly with amount of queued players
+    in pool, each queue_scale players add min_retry_after, capped so that player doesn't expire from queue"""
+    retry_after = min_retry_after * (1 + queued_players / queue_scale)
+    return round(min(max(retry_after, min_retry_after), max_retry_after), 1)
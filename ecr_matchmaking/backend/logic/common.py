@@ -3,25 +3,50 @@ from heapq import nlargest
 from typing import Callable
 
 from models.models import GAME_FACTIONS
+from logic.team_selection import FactionCandidates, select_teams, DEFAULT_RATING
+
+
+def build_faction_candidates(faction_players: list, player_data_map: dict):
+    """Represents (player_id, party_size) queue entries of a faction as arrays for team selection"""
+    ratings = []
+    region_groups = []
+    entered_times = []
+    for player_id, _ in faction_players:
+        player_info = player_data_map.get(player_id, {})
+        ratings.append(player_info.get("rating", DEFAULT_RATING))
+        region_groups.append(player_info.get("region_group"))
+        entered_times.append(player_info.get("entered_time", 0))
+    return FactionCandidates([party_size for _, party_size in faction_players], ratings, region_groups,
+                             entered_times)
+
+
+def group_parties_by_faction(player_data_map: dict):
+    """Groups (leader id, party size) queue entries by faction, ordered like party queue buckets in Redis:
+    larger parties first, then the ones who entered the queue earlier"""
+    faction_parties = {}
+    for player_id, player_info in player_data_map.items():
+        faction_parties.setdefault(player_info["faction"], []).append((player_id, len(player_info["party_members"])))
 
+    for parties in faction_parties.values():
+        parties.sort(key=lambda party: (-party[1], player_data_map[party[0]].get("entered_time", 0)))
+    return faction_parties
 
-def try_create_pvp_match_common(player_data_map: dict, oldest_player_queue_time: float, newest_player_queue_time: float,
-                                matchmaking_config_for_mode: dict, determine_team_size: Callable,
-                                ignore_faction_min_amount: bool = False):
-    """ Attempts to create a PvP match by balancing factions and handling party sizes"""
-    # Group players by faction while considering party sizes
-    faction_counts = {}
-    player_to_party = {}
 
-    for player_id, player_info in player_data_map.items():
-        faction = player_info["faction"]
-        party_members = player_info["party_members"]
-        party_size = len(party_members)
+def get_party_members(player_data_map: dict, player_id: str):
+    player_info = player_data_map.get(player_id)
+    return player_info["party_members"] if player_info else [player_id]
+
 
-        player_to_party[player_id] = party_members
-        if faction not in faction_counts:
-            faction_counts[faction] = []
-        faction_counts[faction].append((player_id, party_size))
+def try_create_pvp_match_common(player_data_map: dict, oldest_player_queue_time: float, newest_player_queue_time: float,
+                                matchmaking_config_for_mode: dict, determine_team_size: Callable,
+                                ignore_faction_min_amount: bool = False, faction_parties: dict = None):
+    """ Attempts to create a PvP match by balancing factions and handling party sizes.
+    If faction_parties are given (already grouped and ordered, as read from party queue buckets),
+    player_data_map is only used for details of leaders"""
+    # Queue entries grouped by faction, larger parties first, then the ones who entered the queue earlier
+    if faction_parties is None:
+        faction_parties = group_parties_by_faction(player_data_map)
+    faction_counts = {faction: parties for faction, parties in faction_parties.items() if parties}
 
     if len(faction_counts) < 2:
         if ignore_faction_min_amount:
@@ -42,10 +67,6 @@ def try_create_pvp_match_common(player_data_map: dict, oldest_player_queue_time:
     (faction1, faction1_players), (faction2, faction2_players) = nlargest(2, faction_counts.items(),
                                                                           key=lambda x: total_faction_size(x[1]))
 
-    # Sort within factions: prioritize larger parties first, maintaining queue order
-    faction1_players.sort(key=lambda x: (-x[1]))
-    faction2_players.sort(key=lambda x: (-x[1]))
-
     # Get total player counts per faction
     faction1_count = total_faction_size(faction1_players)
     faction2_count = total_faction_size(faction2_players)
@@ -58,19 +79,22 @@ def try_create_pvp_match_common(player_data_map: dict, oldest_player_queue_time:
         # Not enough players for a match
         return
 
-    # Select players while ensuring team size constraints
+    # Select players while ensuring team size constraints, balancing skill and regions of teams
+    faction1_selected, faction2_selected = select_teams(build_faction_candidates(faction1_players, player_data_map),
+                                                        build_faction_candidates(faction2_players, player_data_map),
+                                                        team_size, ordered=True)
     selected_faction1 = []
     selected_faction2 = []
     faction1_used, faction2_used = 0, 0  # Track total selected players per faction
 
-    for player_id, party_size in faction1_players:
-        if faction1_used + party_size <= team_size:
-            selected_faction1.extend(player_to_party.get(player_id, [player_id]))
+    for (player_id, party_size), is_selected in zip(faction1_players, faction1_selected):
+        if is_selected:
+            selected_faction1.extend(get_party_members(player_data_map, player_id))
             faction1_used += party_size
 
-    for player_id, party_size in faction2_players:
-        if faction2_used + party_size <= team_size:
-            selected_faction2.extend(player_to_party.get(player_id, [player_id]))
+    for (player_id, party_size), is_selected in zip(faction2_players, faction2_selected):
+        if is_selected:
+            selected_faction2.extend(get_party_members(player_data_map, player_id))
             faction2_used += party_size
 
     players_in_match = selected_faction1 + selected_faction2
@@ -110,21 +134,12 @@ def try_create_pvp_match_common(player_data_map: dict, oldest_player_queue_time:
 
 
 def try_create_pve_match_common(player_data_map: dict, latest_ts: float, matchmaking_config_for_mode: dict,
-                                determine_team_size: Callable):
+                                determine_team_size: Callable, faction_parties: dict = None):
     """ Attempts to create a PvP match by balancing factions and handling party sizes"""
-    # Group players by faction while considering party sizes
-    faction_counts = {}
-    player_to_party = {}
-
-    for player_id, player_info in player_data_map.items():
-        faction = player_info["faction"]
-        party_members = player_info["party_members"]
-        party_size = len(party_members)
-
-        player_to_party[player_id] = party_members
-        if faction not in faction_counts:
-            faction_counts[faction] = []
-        faction_counts[faction].append((player_id, party_size))
+    # Queue entries grouped by faction, larger parties first, then the ones who entered the queue earlier
+    if faction_parties is None:
+        faction_parties = group_parties_by_faction(player_data_map)
+    faction_counts = {faction: parties for faction, parties in faction_parties.items() if parties}
 
     if len(faction_counts) < 1:
         return  # Not enough diversity
@@ -136,9 +151,6 @@ def try_create_pve_match_common(player_data_map: dict, latest_ts: float, matchma
     ((faction1, faction1_players),) = nlargest(1, faction_counts.items(),
                                                key=lambda x: total_faction_size(x[1]))
 
-    # Sort within factions: prioritize larger parties first, maintaining queue order
-    faction1_players.sort(key=lambda x: (-x[1]))
-
     # Get total player counts per faction
     faction1_count = total_faction_size(faction1_players)
 
@@ -154,7 +166,7 @@ def try_create_pve_match_common(player_data_map: dict, latest_ts: float, matchma
 
     for player_id, party_size in faction1_players:
         if faction1_used + party_size <= team_size:
-            selected_faction1.extend(player_to_party.get(player_id, [player_id]))
+            selected_faction1.extend(get_party_members(player_data_map, player_id))
             faction1_used += party_size
 
     players_in_match = selected_faction1
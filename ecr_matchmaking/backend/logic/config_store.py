@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import hashlib
+import logging
+
+import httpx
+from pydantic import ValidationError
+
+from models.models import MatchmakingConfig
+from logic.regions import RegionGraph, update_region_graph
+from logic.metrics import set_config_info
+
+logger = logging.getLogger(__name__)
+
+
+class ActiveConfig:
+    """Matchmaking config that is in use, replaced as a whole, never modified"""
+
+    def __init__(self, config: dict, version: str, etag: str = None, source: str = None):
+        self.config = config
+        self.version = version
+        self.etag = etag
+        self.source = source
+        self.activated_at = time.time()
+
+
+def get_config_version(config: dict):
+    """Short hash of config content, same for same config regardless of formatting"""
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def validate_matchmaking_config(config: dict):
+    """Raises ValueError if config can't be used for matchmaking"""
+    try:
+        validated = MatchmakingConfig.model_validate(config)
+    except ValidationError as e:
+        raise ValueError(f"Invalid matchmaking config: {e}")
+
+    if validated.region_groups is not None or validated.region_group_distances is not None:
+        RegionGraph(validated.region_groups or {}, validated.region_group_distances or {})
+
+    unknown_missions = validated.get_unknown_missions()
+    if unknown_missions:
+        logger.warning(f"Matchmaking config references missions without data: {unknown_missions}")
+
+
+class MatchmakingConfigStore:
+    """Keeps matchmaking config from storage: polls it with ETag, validates new versions before swapping them in
+    and keeps the last good one on local disk, so restart doesn't depend on storage being available.
+
+    If Redis is given, active config is also published to a Redis hash, so all workers and nodes use the same
+    version: each of them checks version in Redis at most once per local_ttl seconds"""
+
+    def __init__(self, url: str, snapshot_path: str, redis=None, redis_key: str = None, local_ttl: float = 5):
+        self.url = url
+        self.snapshot_path = snapshot_path
+        self.redis = redis
+        self.redis_key = redis_key
+        self.local_ttl = local_ttl
+        self.active = None
+        self.last_sync_time = 0
+
+    @property
+    def config(self):
+        active = self.active
+        return active.config if active is not None else None
+
+    @property
+    def version(self):
+        active = self.active
+        return active.version if active is not None else None
+
+    def activate(self, config: dict, etag: str = None, source: str = None):
+        """Validates config and makes it active, returns False if it's the same version as active one"""
+        version = get_config_version(config)
+        if self.active is not None and self.active.version == version:
+            # Same content, only remember new ETag
+            active = ActiveConfig(self.active.config, version, etag or self.active.etag, source)
+            active.activated_at = self.active.activated_at
+            self.active = active
+            return False
+
+        validate_matchmaking_config(config)
+        if "region_groups" in config or "region_group_distances" in config:
+            # Regions can be added through config, without redeploying
+            update_region_graph(config.get("region_groups"), config.get("region_group_distances"))
+
+        self.active = ActiveConfig(config, version, etag, source)
+        set_config_info(version, source or "")
+        logger.info(f"Activated matchmaking config version {version} from {source}")
+        return True
+
+    def load_snapshot(self):
+        """Activates config saved on disk by previous run, returns whether it was loaded"""
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+            self.activate(snapshot["config"], snapshot.get("etag"), source="snapshot")
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.error(f"Couldn't load matchmaking config snapshot {self.snapshot_path}: {e}")
+            return False
+
+    def save_snapshot(self):
+        active = self.active
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"version": active.version, "etag": active.etag, "config": active.config}, f)
+            # Replace is atomic, so snapshot is never read half written
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.error(f"Couldn't save matchmaking config snapshot {self.snapshot_path}: {e}")
+
+    async def refresh(self, client: httpx.AsyncClient):
+        """Fetches config from storage if it changed since the last fetch, returns whether active config changed"""
+        headers = {}
+        if self.active is not None and self.active.etag:
+            headers["If-None-Match"] = self.active.etag
+
+        r = await client.get(self.url, headers=headers)
+        if r.status_code == 304:
+            changed = False
+        else:
+            r.raise_for_status()
+            changed = self.activate(r.json(), r.headers.get("ETag"), source="storage")
+            if changed:
+                self.save_snapshot()
+
+        # Active config was just confirmed by storage, so it's the only one that may be published
+        await self.publish()
+        return changed
+
+    async def publish(self):
+        """Shares active config with other workers through Redis if it isn't published already. Called only after
+        successful refresh, so a worker with an older snapshot never publishes it. If two workers publish at the
+        same time and the older one wins, the next refresh of each worker fetches the newer one and publishes it"""
+        active = self.active
+        if self.redis is None or active is None:
+            return
+        try:
+            if await self.redis.hget(self.redis_key, "version") == active.version:
+                return
+            await self.redis.hset(self.redis_key, mapping={
+                "version": active.version,
+                "etag": active.etag or "",
+                "config": json.dumps(active.config)
+            })
+        except Exception as e:
+            logger.error(f"Couldn't publish matchmaking config version {active.version} to Redis: {e}")
+
+    async def sync(self, force=False):
+        """Switches to the config version published in Redis if it differs from active one, checks Redis not more
+        often than once per local_ttl, returns active config"""
+        now = time.time()
+        if self.redis is None or (not force and now - self.last_sync_time < self.local_ttl):
+            return self.config
+        self.last_sync_time = now
+
+        try:
+            published_version = await self.redis.hget(self.redis_key, "version")
+            if published_version is None:
+                # Nothing published yet (or Redis was flushed), own config may be an old snapshot, so it's kept
+                # locally and published only after refresh from storage
+                pass
+            elif published_version != self.version:
+                etag, config = await self.redis.hmget(self.redis_key, ["etag", "config"])
+                if self.activate(json.loads(config), etag or None, source="redis"):
+                    self.save_snapshot()
+        except Exception as e:
+            logger.error(f"Couldn't sync matchmaking config with Redis, keeping version {self.version}: {e}")
+        return self.config
@@ -1,40 +1,131 @@
+import time
+import asyncio
 import traceback
 
 import httpx
-from logic.regions import get_region_group_ordered, get_region_group_distance_map
-
-
-async def try_to_launch_match(logger, region_group_counts, servers_to_region_groups, resource_units, version_and_contour, game_map,
-                              game_mission, game_mode, match_id, faction_setup, max_team_size):
-    distance_map = get_region_group_distance_map("eu")
-    ordered_server_groups = get_region_group_ordered(region_group_counts, list(set(servers_to_region_groups.values())),
-                                                     distance_map)
-    if not ordered_server_groups:
-        logger.error(
-            f"Trying to create match, but ordered server group empty: {servers_to_region_groups} for {region_group_counts}")
-        return False, None, None
-
-    for ordered_region_group in ordered_server_groups:
-        for server, region_group in servers_to_region_groups.items():
-            if region_group == ordered_region_group:
-                try:
-                    async with httpx.AsyncClient() as client:
-                        r = await client.post(f"http://{server}/launch", json={
-                            "game_version": version_and_contour.split("-")[0],
-                            "game_contour": version_and_contour.split("-")[1],
-                            "game_map": game_map,
-                            "game_mode": game_mode,
-                            "game_mission": game_mission,
-                            "resource_units": resource_units,
-                            "match_unique_id": str(match_id),
-                            "faction_setup": faction_setup,
-                            "max_team_size": max_team_size
-                        })
-                        r.raise_for_status()
-                        data = r.json()
-                        return True, server, data
-                except Exception as e:
-                    logger.error(f"Error during server launch request: {e}")
-                    logger.error(traceback.format_exc())
-
-    return False, None, None
\ No newline at end of file
+from logic.regions import get_region_group_ordered
+from logic.metrics import LAUNCH_LATENCY
+
+# Release requests to servers whose launch lost the race, kept until done so they aren't garbage collected
+release_tasks = set()
+# Launch requests to one server are sent one at a time, as ticks of different pools run concurrently and can pick
+# the same server. Locks are per process like the shared client's connection pool, other workers' launches
+# are checked by the server itself, which rejects launch without free resources, so the next server is tried
+server_launch_locks = {}
+
+
+async def launch_on_server(client: httpx.AsyncClient, server, launch_data):
+    """Sends launch request to game server after previous launch to it is answered, returns its response data"""
+    if server not in server_launch_locks:
+        server_launch_locks[server] = asyncio.Lock()
+    async with server_launch_locks[server]:
+        return await _send_launch(client, server, launch_data)
+
+
+async def _send_launch(client: httpx.AsyncClient, server, launch_data):
+    start = time.perf_counter()
+    result = "error"
+    try:
+        r = await client.post(f"http://{server}/launch", json=launch_data)
+        r.raise_for_status()
+        result = "success"
+        return r.json()
+    except asyncio.CancelledError:
+        # Hedged request that lost the race
+        result = "cancelled"
+        raise
+    finally:
+        LAUNCH_LATENCY.labels(server, result).observe(time.perf_counter() - start)
+
+
+async def release_on_server(logger, client: httpx.AsyncClient, server, match_id):
+    """Asks game server to stop instance launched for match, if it was launched"""
+    try:
+        r = await client.post(f"http://{server}/stop", json={"match_unique_id": str(match_id)})
+        r.raise_for_status()
+    except Exception as e:
+        logger.error(f"Error during release request to {server} for match {match_id}: {e}")
+
+
+def order_servers_for_match(region_group_counts, servers_data, resource_units):
+    """Orders servers that can run a match by region distance to players, then by free resource units and free
+    instances, servers without enough free resources or too far from players are skipped"""
+    available_region_groups = {server_data["region_group"] for server_data in servers_data.values()}
+    ordered_server_groups = get_region_group_ordered(region_group_counts, list(available_region_groups))
+    region_group_ranks = {region_group: rank for rank, region_group in enumerate(ordered_server_groups)}
+
+    servers_with_scores = []
+    for server, server_data in servers_data.items():
+        region_group_rank = region_group_ranks.get(server_data["region_group"].upper())
+        free_resource_units = server_data["free_resource_units"]
+        free_instances_amount = server_data["free_instances_amount"]
+        if region_group_rank is None or free_resource_units < resource_units or free_instances_amount <= 0:
+            continue
+        servers_with_scores.append(((region_group_rank, -free_resource_units, -free_instances_amount), server))
+
+    return [server for _, server in sorted(servers_with_scores)]
+
+
+async def try_to_launch_match(logger, client: httpx.AsyncClient, ordered_servers, resource_units,
+                              version_and_contour, game_map, game_mission, game_mode, match_id, faction_setup,
+                              max_team_size, hedge_delay=None, timeout=None):
+    """Launches match on the first server of ordered servers. If hedge_delay is set and server doesn't respond
+    in hedge_delay seconds, launch is also sent to the next server and the first successful response is taken.
+    If timeout is set, launch fails when no server acknowledged it in timeout seconds"""
+    launch_data = {
+        "game_version": version_and_contour.split("-")[0],
+        "game_contour": version_and_contour.split("-")[1],
+        "game_map": game_map,
+        "game_mode": game_mode,
+        "game_mission": game_mission,
+        "resource_units": resource_units,
+        "match_unique_id": str(match_id),
+        "faction_setup": faction_setup,
+        "max_team_size": max_team_size
+    }
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    tasks_to_servers = {}
+    next_server_index = 0
+    try:
+        while tasks_to_servers or next_server_index < len(ordered_servers):
+            if next_server_index < len(ordered_servers):
+                server = ordered_servers[next_server_index]
+                next_server_index += 1
+                tasks_to_servers[asyncio.create_task(launch_on_server(client, server, launch_data))] = server
+
+            # Without hedging wait for the current server, otherwise only until it's time to try the next one
+            wait_timeout = hedge_delay if next_server_index < len(ordered_servers) else None
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    logger.error(f"Launch of match {match_id} timed out after {timeout} seconds")
+                    break
+                wait_timeout = remaining if wait_timeout is None else min(wait_timeout, remaining)
+            done, _ = await asyncio.wait(tasks_to_servers, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                server = tasks_to_servers.pop(task)
+                if task.exception() is None:
+                    return True, server, task.result()
+
+                e = task.exception()
+                logger.error(f"Error during server launch request to {server}: {e}")
+                logger.error("".join(traceback.format_exception(type(e), e, e.__traceback__)))
+    finally:
+        # Launch requests that lost the race are cancelled, but they could be already received by servers,
+        # so these servers are asked to release the match, else its instance would hold resource units without players
+        for task, server in tasks_to_servers.items():
+            if not task.done():
+                task.cancel()
+                logger.warning(f"Cancelled hedged launch request to {server} for match {match_id}, releasing it")
+            elif task.exception() is None:
+                logger.warning(f"Server {server} also launched match {match_id}, releasing it")
+            else:
+                continue
+            release_task = asyncio.create_task(release_on_server(logger, client, server, match_id))
+            release_tasks.add(release_task)
+            release_task.add_done_callback(release_tasks.discard)
+
+    return False, None, None
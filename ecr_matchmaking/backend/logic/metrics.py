@@ -0,0 +1,115 @@
+import os
+import time
+
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, multiprocess, \
+    start_http_server
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+
+QUEUE_DEPTH = Gauge(
+    "matchmaking_queue_depth",
+    "Players (queue entries) in pool queue, measured on each match creation tick",
+    ["pool"],
+    multiprocess_mode="livemostrecent"
+)
+TIME_IN_QUEUE = Histogram(
+    "matchmaking_time_in_queue_seconds",
+    "Time from entering the queue until match is assigned",
+    ["pool", "assignment"],
+    buckets=(5, 10, 20, 30, 45, 60, 90, 120, 180, 300, 600, 1200)
+)
+MATCH_CREATION_ATTEMPTS = Counter(
+    "matchmaking_match_creation_attempts",
+    "Match creation attempts by outcome (match, waiting, no_servers, no_mission, launch_failed, ...)",
+    ["pool", "outcome"]
+)
+LAUNCH_LATENCY = Histogram(
+    "matchmaking_launch_request_seconds",
+    "Latency of launch requests to game servers",
+    ["server", "result"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 10)
+)
+REDIS_LATENCY = Histogram(
+    "matchmaking_redis_command_seconds",
+    "Latency of Redis commands, scripts are labelled by name and pipelines as PIPELINE",
+    ["command"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+# Info metrics aren't supported in multiprocess mode, so active config is a gauge set to 1 for each worker
+CONFIG_INFO = Gauge(
+    "matchmaking_config_info",
+    "Version and source of active matchmaking config",
+    ["version", "source"],
+    multiprocess_mode="liveall"
+)
+
+# Labels of active config in CONFIG_INFO, reset to 0 when another config is activated
+config_info_labels = None
+
+
+def set_config_info(version: str, source: str):
+    global config_info_labels
+    if config_info_labels is not None:
+        CONFIG_INFO.labels(*config_info_labels).set(0)
+    config_info_labels = (version, source)
+    CONFIG_INFO.labels(*config_info_labels).set(1)
+
+
+def start_metrics_server(port: int, addr: str):
+    """Serves metrics of all workers on internal port. With several workers PROMETHEUS_MULTIPROC_DIR must be set,
+    so they share metrics through files there, and only the first worker that binds the port serves them.
+    Returns whether this worker serves metrics"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    try:
+        start_http_server(port, addr=addr, registry=registry)
+    except OSError:
+        # Port is taken by another worker, which serves metrics of this one too
+        return False
+    return True
+
+
+def mark_metrics_process_dead(pid: int):
+    """Removes live gauges of exited worker from shared metrics"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+# Names of registered Lua scripts by their SHA, so EVALSHA calls are labelled by script
+script_names = {}
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        start = time.perf_counter()
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            REDIS_LATENCY.labels("PIPELINE").observe(time.perf_counter() - start)
+
+
+class InstrumentedRedis(Redis):
+    """Redis client that measures latency of each command"""
+
+    def register_named_script(self, name, script):
+        registered_script = self.register_script(script)
+        script_names[registered_script.sha] = name
+        return registered_script
+
+    def pipeline(self, transaction: bool = True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+    async def execute_command(self, *args, **options):
+        command = args[0]
+        if command == "EVALSHA":
+            command = script_names.get(args[1], command)
+
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            REDIS_LATENCY.labels(command).observe(time.perf_counter() - start)
@@ -33,5 +33,7 @@ def determine_team_size_instant_pve(faction1_count, oldest_player_queue_time):
     return team_size, 1, 4, "raid4"
 
 
-def try_create_pve_match(player_data_map, oldest_player_queue_time, matchmaking_config_for_mode, instant_creation=False):
-    return try_create_pve_match_common(player_data_map, oldest_player_queue_time, matchmaking_config_for_mode, determine_team_size_instant_pve if instant_creation else determine_team_size_pve)
+def try_create_pve_match(player_data_map, oldest_player_queue_time, matchmaking_config_for_mode, instant_creation=False,
+                         faction_parties=None):
+    return try_create_pve_match_common(player_data_map, oldest_player_queue_time, matchmaking_config_for_mode, determine_team_size_instant_pve if instant_creation else determine_team_size_pve,
+                                       faction_parties=faction_parties)
@@ -47,8 +47,8 @@ def determine_team_size_instant_pvp(faction1_count, faction2_count, oldest_playe
 
 def try_create_pvp_match_casual(player_data_map: dict, oldest_player_queue_time: float, newest_player_queue_time: float,
                                 matchmaking_config_for_mode: dict,
-                                instant_creation=False):
+                                instant_creation=False, faction_parties: dict = None):
     return try_create_pvp_match_common(player_data_map, oldest_player_queue_time, newest_player_queue_time,
                                        matchmaking_config_for_mode,
                                        determine_team_size_instant_pvp if instant_creation else determine_team_size_casual,
-                                       ignore_faction_min_amount=instant_creation)
+                                       ignore_faction_min_amount=instant_creation, faction_parties=faction_parties)
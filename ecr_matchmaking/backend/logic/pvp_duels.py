@@ -15,6 +15,7 @@ def determine_team_size_duel(faction1_count, faction2_count, oldest_player_queue
 
 
 def try_create_pvp_match_duel(player_data_map: dict, oldest_player_queue_time: float, newest_player_queue_time: float,
-                              matchmaking_config_for_mode: dict):
+                              matchmaking_config_for_mode: dict, faction_parties: dict = None):
     return try_create_pvp_match_common(player_data_map, oldest_player_queue_time, newest_player_queue_time,
-                                       matchmaking_config_for_mode, determine_team_size_duel)
+                                       matchmaking_config_for_mode, determine_team_size_duel,
+                                       faction_parties=faction_parties)
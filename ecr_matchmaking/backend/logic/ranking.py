@@ -1,61 +1,130 @@
-import trueskill
+import math
+from statistics import NormalDist
 
-from mpmath import mp
-mp.dps = 250
+import numpy as np
 
-# Initialize TrueSkill environment
-env = trueskill.TrueSkill(backend='mpmath')
+# TrueSkill environment (same defaults as trueskill package)
+MU = 25.0  # Initial mean of player skill
+SIGMA = MU / 3  # Initial deviation of player skill
+BETA = SIGMA / 2  # Skill difference that gives ~76% chance to win
+TAU = SIGMA / 100  # Dynamics factor, keeps deviation from reaching zero
+DRAW_PROBABILITY = 0.10
 
+# Match outcomes
+TEAM1_WON = 1
+TEAM2_WON = -1
+DRAW = 0
 
-# Function to update ratings after a 2vs2 match
-def update_2vs2_ratings(player1, player2, player3, player4, outcome):
-    """
-    Update the ratings of players after a 2vs2 match.
-
-    :param player1: TrueSkill rating of player 1
-    :param player2: TrueSkill rating of player 2
-    :param player3: TrueSkill rating of player 3
-    :param player4: TrueSkill rating of player 4
-    :param outcome: 1 if team1 wins, 0 if team2 wins
-    :return: Updated TrueSkill ratings for all players
-    """
-    # Players in each team
-    team1 = [player1, player2]  # Player 1 and Player 2 are in Team 1
-    team2 = [player3, player4]  # Player 3 and Player 4 are in Team 2
+_erfc = np.vectorize(math.erfc, otypes=[float])
+_draw_margin_factor = NormalDist().inv_cdf((DRAW_PROBABILITY + 1) / 2) * BETA
+
+
+def _pdf(x):
+    return np.exp(-x * x / 2) / math.sqrt(2 * math.pi)
+
+
+def _cdf(x):
+    return 0.5 * _erfc(-x / math.sqrt(2))
+
+
+def _v_win(x, eps):
+    """Mean additive correction of truncated gaussian for win"""
+    x = x - eps
+    denom = _cdf(x)
+    # When the winner was expected to lose badly, the correction tends to -x
+    safe_denom = np.where(denom > 1e-300, denom, 1)
+    return np.where(denom > 1e-300, _pdf(x) / safe_denom, -x)
+
+
+def _w_win(x, eps):
+    """Variance multiplicative correction of truncated gaussian for win"""
+    v = _v_win(x, eps)
+    return np.clip(v * (v + x - eps), 0, 1)
 
-    # Determine match outcome
-    if outcome == 1:
-        # Team 1 wins
-        result = [0, 1]
-    elif outcome == 0:
-        # Team 2 wins
-        result = [1, 0]
-    else:
-        raise ValueError("Invalid outcome value. It must be 0 or 1.")
 
-    # Rate the players based on the outcome
-    updated_players = env.rate([team1, team2], result)
+def _v_draw(x, eps):
+    """Mean additive correction of truncated gaussian for draw"""
+    abs_x = np.abs(x)
+    a, b = eps - abs_x, -eps - abs_x
+    denom = _cdf(a) - _cdf(b)
+    safe_denom = np.where(denom > 1e-300, denom, 1)
+    v = np.where(denom > 1e-300, (_pdf(b) - _pdf(a)) / safe_denom, a)
+    return np.where(x < 0, -v, v)
 
-    # Return updated player ratings
-    return updated_players
 
+def _w_draw(x, eps):
+    """Variance multiplicative correction of truncated gaussian for draw"""
+    abs_x = np.abs(x)
+    a, b = eps - abs_x, -eps - abs_x
+    denom = _cdf(a) - _cdf(b)
+    safe_denom = np.where(denom > 1e-300, denom, 1)
+    v = _v_draw(abs_x, eps)
+    return np.clip(np.where(denom > 1e-300, v ** 2 + (a * _pdf(a) - b * _pdf(b)) / safe_denom, 1), 0, 1)
+
+
+def quality_from_sums(mu_diffs, sigma_sq_sums, players_amounts):
+    """Draw probability (match quality) of 2-team matches given difference of team skill sums,
+    sum of skill variances of all players and amount of players, all arguments can be arrays"""
+    mu_diffs = np.asarray(mu_diffs, dtype=np.float64)
+    players_beta_sq = np.asarray(players_amounts, dtype=np.float64) * BETA ** 2
+    c_sq = players_beta_sq + np.asarray(sigma_sq_sums, dtype=np.float64)
+    return np.sqrt(players_beta_sq / c_sq) * np.exp(-mu_diffs ** 2 / (2 * c_sq))
+
+
+def quality_batch(mus, sigmas, teams):
+    """Match quality of many candidate team splits of the same players at once.
+
+    :param mus: skill means of players, shape (players,)
+    :param sigmas: skill deviations of players, shape (players,)
+    :param teams: team of each player in each split, 1 for team 1, -1 for team 2, 0 if player isn't in match,
+                  shape (splits, players)
+    :return: quality of each split, shape (splits,)
+    """
+    teams = np.asarray(teams, dtype=np.float64)
+    in_match = np.abs(teams)
+    return quality_from_sums(teams @ np.asarray(mus, dtype=np.float64),
+                             in_match @ np.asarray(sigmas, dtype=np.float64) ** 2,
+                             in_match.sum(axis=-1))
+
+
+def rate_matches(mus, sigmas, match_indexes, teams, outcomes):
+    """Updates skills of all participants of many 2-team matches at once.
+
+    :param mus: skill means of participants, shape (participants,)
+    :param sigmas: skill deviations of participants, shape (participants,)
+    :param match_indexes: index of match of each participant, shape (participants,)
+    :param teams: team of each participant, 1 for team 1, -1 for team 2
+    :param outcomes: outcome of each match (TEAM1_WON, TEAM2_WON or DRAW), shape (matches,)
+    :return: new skill means and deviations of participants
+    """
+    mus = np.asarray(mus, dtype=np.float64)
+    match_indexes = np.asarray(match_indexes, dtype=np.int64)
+    teams = np.asarray(teams, dtype=np.float64)
+    outcomes = np.asarray(outcomes, dtype=np.float64)
+    matches_amount = len(outcomes)
 
-# Example player ratings (initial ratings)
-player1 = trueskill.Rating(mu=60, sigma=1)
-player2 = trueskill.Rating(mu=60, sigma=1)
-player3 = trueskill.Rating(mu=60, sigma=1)
-player4 = trueskill.Rating(mu=60, sigma=1)
+    # Skill may have changed since the last match
+    sigmas_sq = np.asarray(sigmas, dtype=np.float64) ** 2 + TAU ** 2
 
-# Outcome of the match: 1 means Team 1 won, 0 means Team 2 won
-outcome = 0 # Example: Team 1 wins
+    players_amounts = np.bincount(match_indexes, minlength=matches_amount)
+    c_sq = np.bincount(match_indexes, weights=sigmas_sq, minlength=matches_amount) + players_amounts * BETA ** 2
+    c = np.sqrt(c_sq)
+    mu_diffs = np.bincount(match_indexes, weights=teams * mus, minlength=matches_amount)
+    eps = _draw_margin_factor * np.sqrt(players_amounts) / c
 
-print(env.quality([[player1, player2], [player3, player4]]))
+    # Performance difference from the point of view of team 1, or of the winner
+    winner_signs = np.where(outcomes == DRAW, 1, outcomes)
+    t = winner_signs * mu_diffs / c
+    is_draw = outcomes == DRAW
+    v = np.where(is_draw, _v_draw(t, eps), _v_win(t, eps))
+    w = np.where(is_draw, _w_draw(t, eps), _w_win(t, eps))
 
-# Update the ratings after the match
-updated_ratings = update_2vs2_ratings(player1, player2, player3, player4, outcome)
+    player_signs = teams * winner_signs[match_indexes]
+    new_mus = mus + player_signs * sigmas_sq / c[match_indexes] * v[match_indexes]
+    new_sigmas = np.sqrt(sigmas_sq * (1 - sigmas_sq / c_sq[match_indexes] * w[match_indexes]))
+    return new_mus, new_sigmas
 
-# Print the updated ratings
-print("Updated ratings after the match:")
-print(f"Team 1's rating: {updated_ratings[0]}")
-print(f"Team 2's rating: {updated_ratings[1]}")
 
+def exposure(mu, sigma):
+    """Conservative skill estimate, grows as player wins and skill estimate becomes certain"""
+    return mu - 3 * sigma
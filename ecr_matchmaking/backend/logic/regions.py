@@ -1,56 +1,128 @@
 import os
+import sys
 import json
 
-with open(os.path.join(os.path.dirname(__file__), "..", "region_groups.json")) as f:
-    region_mapping = json.load(f)
+import numpy as np
+
+DEFAULT_REGION_GROUP = "EU"  # Region group of players from unknown regions
+
+REGION_GROUPS_PATH = os.getenv("REGION_GROUPS_PATH",
+                               os.path.join(os.path.dirname(__file__), "..", "region_groups.json"))
+REGION_GROUP_DISTANCES_PATH = os.getenv("REGION_GROUP_DISTANCES_PATH",
+                                        os.path.join(os.path.dirname(__file__), "..", "region_group_distances.json"))
+
+
+class RegionGraph:
+    """Region to region group mapping and distances between region groups, compiled once into an index and
+    a distance matrix, where groups that shouldn't play together have infinite distance"""
+
+    def __init__(self, region_groups: dict, region_group_distances: dict):
+        groups = {g.upper() for g in region_groups.values()} | {g.upper() for g in region_group_distances}
+        for distances in region_group_distances.values():
+            groups |= {g.upper() for g in distances}
+        self.groups = [sys.intern(g) for g in sorted(groups)]
+        self.group_indexes = {g: i for i, g in enumerate(self.groups)}
+        # Both cases are stored, so most lookups don't need to change case
+        self.group_indexes.update({g.lower(): i for i, g in enumerate(self.groups)})
+
+        self.region_to_group = {}
+        for region, group in region_groups.items():
+            group = self.groups[self.group_indexes[group.upper()]]
+            self.region_to_group[sys.intern(region.upper())] = group
+            self.region_to_group[sys.intern(region.lower())] = group
+
+        self.distances = np.full((len(self.groups), len(self.groups)), np.inf)
+        for g1, distances in region_group_distances.items():
+            for g2, distance in distances.items():
+                i, j = self.group_indexes[g1.upper()], self.group_indexes[g2.upper()]
+                self.distances[i, j] = self.distances[j, i] = distance
+        self.reachable = np.isfinite(self.distances)
+        self.finite_distances = np.where(self.reachable, self.distances, 0)
+
+    def get_group_index(self, region_group):
+        index = self.group_indexes.get(region_group)
+        if index is None and region_group is not None:
+            index = self.group_indexes.get(region_group.upper())
+        return index
+
+    def get_region_group(self, region):
+        group = self.region_to_group.get(region)
+        if group is None:
+            group = self.region_to_group.get(region.upper(), DEFAULT_REGION_GROUP)
+        return group
+
+    def to_distance_map(self):
+        """Distances as nested dicts, group pairs are sorted alphabetically"""
+        distance_map = {}
+        for i, j in zip(*np.nonzero(self.reachable)):
+            if i <= j:
+                distance_map.setdefault(self.groups[i], {})[self.groups[j]] = float(self.distances[i, j])
+        return distance_map
+
+
+def load_region_graph(region_groups_path=REGION_GROUPS_PATH, region_group_distances_path=REGION_GROUP_DISTANCES_PATH):
+    with open(region_groups_path) as f:
+        region_groups = json.load(f)
+    with open(region_group_distances_path) as f:
+        region_group_distances = json.load(f)
+    return RegionGraph(region_groups, region_group_distances)
+
+
+region_graph = load_region_graph()
+
+
+def update_region_graph(region_groups: dict = None, region_group_distances: dict = None):
+    """Recompiles region graph, e.g. from matchmaking config, parts not given are kept from the current graph"""
+    global region_graph
+    if region_groups is None:
+        region_groups = {region: group for region, group in region_graph.region_to_group.items()
+                         if region == region.upper()}
+    if region_group_distances is None:
+        region_group_distances = region_graph.to_distance_map()
+    # Compiled fully before replacing, so readers never see half-built graph
+    region_graph = RegionGraph(region_groups, region_group_distances)
 
 
 def get_region_group_distance_map(region_group):
-    region_group = region_group.upper()
-    if region_group in ["EU", "RU", "US"]:
-        return {
-            "EU": {
-                "EU": 0,
-                "RU": 1,
-                "US": 1.1
-            },
-            "RU": {
-                "RU": 0,
-                "US": 1.2
-            },
-            "US": {
-                "US": 0
-            }
-        }
-    elif region_group in ["EA"]:
-        return {
-            "EA": {
-                "EA": 0,
-            }
-        }
-    else:
+    """Returns compiled region graph which region group belongs to"""
+    if region_graph.get_group_index(region_group) is None:
         raise ValueError("Uknown region group {}".format(region_group))
+    return region_graph
 
 
 def get_region_group(region):
-    return region_mapping.get(region.upper(), "EU")
+    return region_graph.get_region_group(region)
+
 
+def get_region_group_ordered(region_group_to_counts, available_region_groups, distance_map=None):
+    """Orders available region groups by sum of distances to players, groups unreachable for all players
+    or unknown are skipped"""
+    distance_map = distance_map or region_graph
 
-def get_region_group_ordered(region_group_to_counts, available_region_groups, distance_map):
-    available_to_distance_sums = {}
+    available_indexes = []
     for a in available_region_groups:
-        a = a.upper()
-        for r, c in region_group_to_counts.items():
-            r = r.upper()
-            r1, r2 = sorted([a, r])
-            distance = distance_map.get(r1, {}).get(r2, None)
-            if distance is not None:
-                available_to_distance_sums[a] = available_to_distance_sums.get(a, 0) + distance * c
+        index = distance_map.get_group_index(a)
+        if index is not None and index not in available_indexes:
+            available_indexes.append(index)
+
+    player_indexes, counts = [], []
+    for r, c in region_group_to_counts.items():
+        index = distance_map.get_group_index(r)
+        if index is not None:
+            player_indexes.append(index)
+            counts.append(c)
+
+    available_indexes = np.asarray(available_indexes, dtype=np.int64)
+    player_indexes = np.asarray(player_indexes, dtype=np.int64)
+    reachable = distance_map.reachable[available_indexes][:, player_indexes].any(axis=1)
+    distance_sums = distance_map.finite_distances[available_indexes][:, player_indexes] @ np.asarray(counts,
+                                                                                                    dtype=np.float64)
+    available_indexes, distance_sums = available_indexes[reachable], distance_sums[reachable]
 
     if os.getenv("DEBUG_REGION_DISTANCES"):
-        print(available_to_distance_sums)
+        print({distance_map.groups[a]: float(s) for a, s in zip(available_indexes, distance_sums)})
 
-    return sorted(available_to_distance_sums, key=available_to_distance_sums.get, reverse=False)
+    return [distance_map.groups[a] for a in available_indexes[np.argsort(distance_sums, kind="stable")]]
 
 
 if __name__ == '__main__':
@@ -0,0 +1,141 @@
+import numpy as np
+
+from logic import regions
+from logic.ranking import MU
+
+DEFAULT_RATING = MU  # Rating of players without one
+# Swaps made to improve team balance per match creation attempt. Bounded by count, not time, so the same queue gives
+# the same teams regardless of machine load, each swap takes well under a millisecond for thousands of candidates
+SELECTION_MAX_SWAPS = 100
+
+# Weights of selection cost parts
+SKILL_WEIGHT = 1.0  # Per rating point of difference between average ratings of teams
+REGION_WEIGHT = 5.0  # Per player per region group distance from the oldest queued player
+WAIT_WEIGHT = 0.1  # Per player per second of entering the queue later than others
+
+UNKNOWN_REGION_DISTANCE = 10  # Distance between region groups that shouldn't play together
+
+
+class FactionCandidates:
+    """Queue entries (parties) of one faction represented as arrays"""
+
+    def __init__(self, party_sizes, ratings, region_groups, entered_times):
+        self.party_sizes = np.asarray(party_sizes, dtype=np.int64)
+        self.ratings = np.asarray(ratings, dtype=np.float64)
+        self.region_groups = list(region_groups)
+        self.entered_times = np.asarray(entered_times, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.party_sizes)
+
+
+def get_region_distances(region_groups, anchor_region_group):
+    """Distances from each region group to the anchor one, players without region group are treated as close"""
+    if anchor_region_group is None:
+        return np.zeros(len(region_groups))
+
+    graph = regions.region_graph
+    anchor_index = graph.get_group_index(anchor_region_group)
+
+    # Row of compiled distance matrix, with unreachable groups and unknown groups treated as far away
+    anchor_distances = np.full(len(graph.groups) + 2, float(UNKNOWN_REGION_DISTANCE))
+    anchor_distances[-1] = 0
+    if anchor_index is not None:
+        anchor_distances[:-2] = np.where(graph.reachable[anchor_index], graph.distances[anchor_index],
+                                         UNKNOWN_REGION_DISTANCE)
+    unknown_index, no_group_index = len(graph.groups), len(graph.groups) + 1
+    indexes = []
+    for region_group in region_groups:
+        index = graph.get_group_index(region_group)
+        indexes.append(no_group_index if region_group is None else unknown_index if index is None else index)
+    return anchor_distances[np.asarray(indexes, dtype=np.int64)]
+
+
+def fill_team(party_sizes, order, team_size):
+    """Greedily takes parties in given order while they fit into team, returns mask of taken parties"""
+    taken = np.zeros(len(party_sizes), dtype=bool)
+
+    # The longest prefix that fits is taken at once, then only smaller parties can fill the rest
+    ordered_sizes = party_sizes[order]
+    prefix_length = int(np.searchsorted(np.cumsum(ordered_sizes), team_size, side="right"))
+    taken[order[:prefix_length]] = True
+    used = int(ordered_sizes[:prefix_length].sum())
+
+    for i in order[prefix_length:]:
+        if used >= team_size:
+            break
+        if used + party_sizes[i] <= team_size:
+            taken[i] = True
+            used += party_sizes[i]
+    return taken
+
+
+def select_teams(faction1_candidates: FactionCandidates, faction2_candidates: FactionCandidates, team_size: int,
+                 max_swaps: int = SELECTION_MAX_SWAPS, ordered: bool = False):
+    """Selects parties for both teams: first fills teams with the largest parties that entered the queue first,
+    then swaps selected parties with not selected ones of the same size while it reduces the cost of the match
+    (rating difference between teams, region distance and wait time of left out players).
+    If candidates are ordered already (larger parties first, then by entered time), they aren't sorted again.
+    Returns masks of selected parties for each faction"""
+    candidates = [faction1_candidates, faction2_candidates]
+
+    # Match is built around the player who entered the queue first
+    anchor_region_group = None
+    all_entered_times = np.concatenate([c.entered_times for c in candidates])
+    if len(all_entered_times):
+        oldest = int(np.argmin(all_entered_times))
+        anchor_region_group = (faction1_candidates.region_groups + faction2_candidates.region_groups)[oldest]
+
+    selected = []
+    individual_costs = []
+    weighted_ratings = []
+    for c in candidates:
+        # Larger parties first, then the ones who entered the queue earlier (stable, keeps queue order)
+        order = np.arange(len(c)) if ordered else np.lexsort((c.entered_times, -c.party_sizes))
+        selected.append(fill_team(c.party_sizes, order, team_size))
+
+        region_distances = get_region_distances(c.region_groups, anchor_region_group)
+        individual_costs.append(c.party_sizes * (REGION_WEIGHT * region_distances + WAIT_WEIGHT * c.entered_times))
+        weighted_ratings.append(c.party_sizes * c.ratings)
+
+    team_counts = [int(c.party_sizes[s].sum()) for c, s in zip(candidates, selected)]
+    if min(team_counts) == 0:
+        # Nothing to balance against
+        return selected[0], selected[1]
+
+    rating_sums = [float(r[s].sum()) for r, s in zip(weighted_ratings, selected)]
+
+    for _ in range(max_swaps):
+        rating_diff = rating_sums[0] / team_counts[0] - rating_sums[1] / team_counts[1]
+        best = None
+
+        for f, c in enumerate(candidates):
+            selected_indexes = np.flatnonzero(selected[f])
+            other_indexes = np.flatnonzero(~selected[f])
+            if len(other_indexes) == 0:
+                continue
+
+            # Cost change of swapping each selected party (rows) with each not selected one (columns)
+            same_size = c.party_sizes[selected_indexes][:, None] == c.party_sizes[other_indexes][None, :]
+            rating_deltas = weighted_ratings[f][other_indexes][None, :] - weighted_ratings[f][selected_indexes][:, None]
+            sign = 1 if f == 0 else -1
+            new_rating_diffs = rating_diff + sign * rating_deltas / team_counts[f]
+            cost_deltas = SKILL_WEIGHT * (np.abs(new_rating_diffs) - abs(rating_diff)) + \
+                individual_costs[f][other_indexes][None, :] - individual_costs[f][selected_indexes][:, None]
+            cost_deltas[~same_size] = np.inf
+
+            row, column = np.unravel_index(np.argmin(cost_deltas), cost_deltas.shape)
+            if best is None or cost_deltas[row, column] < best[0]:
+                best = (cost_deltas[row, column], f, selected_indexes[row], other_indexes[column],
+                        rating_deltas[row, column])
+
+        if best is None or best[0] >= -1e-9:
+            # No swap improves the match
+            break
+
+        _, f, removed, added, rating_delta = best
+        selected[f][removed] = False
+        selected[f][added] = True
+        rating_sums[f] += rating_delta
+
+    return selected[0], selected[1]
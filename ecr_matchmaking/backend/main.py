@@ -1,25 +1,34 @@
 import os
+import math
+import asyncio
+import secrets
 import traceback
 import uuid
 import time
 import json
 import logging
+from itertools import islice
 
 import httpx
 from aiocache import SimpleMemoryCache
 from fastapi import FastAPI, Header, Request, BackgroundTasks
-from redis.asyncio import Redis
+from fastapi.responses import JSONResponse
 
 from models.models import *
 from logic.pvp_casual import try_create_pvp_match_casual
 from logic.pvp_duels import try_create_pvp_match_duel
 from logic.pve import try_create_pve_match
-from logic.game_server_utils import try_to_launch_match
+from logic.game_server_utils import try_to_launch_match, order_servers_for_match
 from logic.regions import get_region_group
+from logic.config_store import MatchmakingConfigStore
+from logic.team_selection import DEFAULT_RATING
+from logic.admission import get_retry_after
+from logic.metrics import InstrumentedRedis, QUEUE_DEPTH, TIME_IN_QUEUE, MATCH_CREATION_ATTEMPTS, \
+    start_metrics_server, mark_metrics_process_dead
 
 app = FastAPI()
 
-redis = Redis(host=os.getenv("REDIS_HOST"), port=6379, password=os.getenv("REDIS_PASSWORD"), decode_responses=True)
+redis = InstrumentedRedis(host=os.getenv("REDIS_HOST"), port=6379, password=os.getenv("REDIS_PASSWORD"), decode_responses=True)
 
 logging.basicConfig(
     level=logging.WARNING,
@@ -35,38 +44,259 @@ PLAYER_EXPIRATION = 30  # Player stays in queue for 30 seconds without additiona
 MATCH_EXPIRATION = 60  # Match assigned to player will expire after 60 seconds
 MATCH_INFO_EXPIRATION = 120  # Match information (free spots amount) will expire in 2 minutes
 MATCH_CREATION_LOCK_TIMEOUT = 10  # Create a match attempt locks another attempts for 10 seconds
+PLAYER_RATING_EXPIRATION = 30 * 86400  # Cached rating of player who didn't play for 30 days is forgotten
+# Max parties of one faction and size (the oldest ones) considered in one creation attempt, 0 to consider all of them.
+# Limits Redis reads and selection time per tick for very large queues
+MATCH_CREATION_CANDIDATES_PER_BUCKET = int(os.getenv("MATCH_CREATION_CANDIDATES_PER_BUCKET", "200"))
+# Faction and party size buckets of party queue in order parties are considered for teams: larger parties first.
+# Leader is added to party members if not listed, so party can be one player larger than MAX_PARTY_SIZE
+PARTY_QUEUE_BUCKETS = [(faction, party_size) for faction in (*GAME_FACTIONS, None)
+                       for party_size in range(MAX_PARTY_SIZE + 1, 0, -1)]
+MATCHMAKING_TICK_INTERVAL = float(os.getenv("MATCHMAKING_TICK_INTERVAL", "2"))  # Seconds between creation attempts
+MATCHMAKING_CONFIG_URL = "https://storage.yandexcloud.net/ecr-service/api/ecr/server_data/matchmaking_config.json"
+MATCHMAKING_CONFIG_SNAPSHOT_PATH = os.getenv("MATCHMAKING_CONFIG_SNAPSHOT_PATH", "/tmp/matchmaking_config.json")
+MATCHMAKING_CONFIG_POLL_INTERVAL = float(os.getenv("MATCHMAKING_CONFIG_POLL_INTERVAL", "60"))  # Seconds between checks
+MATCHMAKING_CONFIG_LOCAL_TTL = 5  # Seconds worker uses config without checking its version in Redis
+FACTION_COUNTS_LOCAL_TTL = 1  # Seconds worker answers with faction counts without reading them from Redis
+LAUNCH_HEDGE_DELAY = float(os.getenv("LAUNCH_HEDGE_DELAY", "1"))  # Seconds before launch is also sent to next server
+# Seconds the whole launch (with hedged requests) may take, well under MATCH_CREATION_LOCK_TIMEOUT, so another worker
+# can't take the lock and create a match for the same players while launch is still going
+LAUNCH_TIMEOUT = min(float(os.getenv("LAUNCH_TIMEOUT", "5")), MATCH_CREATION_LOCK_TIMEOUT / 2)
+HTTP_CONNECT_TIMEOUT = 2  # Seconds to establish connection to game server or storage
+HTTP_READ_TIMEOUT = 10  # Seconds to wait for game server or storage response
+HTTP_MAX_CONNECTIONS = 100  # Connections kept in shared pool
+HTTP_KEEPALIVE_EXPIRY = 60  # Idle connections are kept alive for 60 seconds
+PLAYER_RATE_LIMIT = float(os.getenv("PLAYER_RATE_LIMIT", "1"))  # Queue requests per second allowed for player
+PLAYER_RATE_BURST = int(os.getenv("PLAYER_RATE_BURST", "5"))  # Requests player can make at once after being idle
+IP_RATE_LIMIT = float(os.getenv("IP_RATE_LIMIT", "20"))  # Queue requests per second allowed for IP (NAT, parties)
+IP_RATE_BURST = int(os.getenv("IP_RATE_BURST", "50"))  # Requests IP can make at once after being idle
+RATE_LIMIT_EXPIRATION = 60  # Idle token buckets are removed after 60 seconds, they are full again by then
+MIN_RETRY_AFTER = MATCHMAKING_TICK_INTERVAL  # Polling faster than matches are created is useless
+MAX_RETRY_AFTER = PLAYER_EXPIRATION / 3  # Player must refresh queue entry before it expires, even if a retry fails
+RETRY_AFTER_QUEUE_SCALE = 500  # Each 500 queued players in pool add MIN_RETRY_AFTER seconds to retry_after
 FULL_DEBUG_MODE = os.getenv("FULL_DEBUG_MODE") == "1"  # Whether to debug each matchmaking request
 INSTANT_CREATION_MODE = os.getenv("INSTANT_CREATION_MODE") == "1"  # Whether to create match even with 1 player in queue
 DISABLE_CREATION_MODE = os.getenv("DISABLE_CREATION_MODE") == "1"  # Whether only to existing servers, not create new ones
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))  # Prometheus metrics are served on separate internal port
+METRICS_ADDR = os.getenv("METRICS_ADDR", "127.0.0.1")  # Not reachable from outside unless set to public address
+BACKEND_API_KEY = os.getenv("BACKEND_API_KEY", "")  # Shared with progression backend, which pushes player ratings
 
 logger.info(f"Starting with FULL_DEBUG_MODE: {FULL_DEBUG_MODE}, INSTANT_CREATION_MODE: {INSTANT_CREATION_MODE}, "
             f"DISABLE_CREATION_MODE: {DISABLE_CREATION_MODE}")
 
 # State
 cache = SimpleMemoryCache()
-
-# Lua script for atomic match join (single-threaded decrement of free spots in match)
+# Shared connection pool for game server and storage requests, so launch doesn't pay for connection setup
+http_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY)
+)
+pool_tick_tasks = {}  # Background match creation task for each active pool
+scheduler_task = None
+match_waiters = {}  # Events of requests waiting for a match for each player
+match_notifications_task = None
+config_polling_task = None
+
+# Lua script for atomic match join: picks the match with most free spots for faction from the free spots index
+# and decrements its free spots (single-threaded, so no spot is given twice)
 JOIN_MATCH_LUA = """
-local match_key = KEYS[1]
-local faction_field = ARGV[1]
+local free_spots_key = KEYS[1]
+local ongoing_match_key_prefix = ARGV[1]
+local faction_field = ARGV[2]
+
+-- Matches without free spots return to index when their server reports free spots again
+redis.call("ZREMRANGEBYSCORE", free_spots_key, "-inf", 0)
+
+while true do
+    local match_ids = redis.call("ZREVRANGE", free_spots_key, 0, 0)
+    if #match_ids == 0 then
+        return false
+    end
+
+    local match_id = match_ids[1]
+    local match_key = ongoing_match_key_prefix .. match_id
+    local free = tonumber(redis.call("HGET", match_key, faction_field))
+
+    if free and free > 0 then
+        redis.call("HINCRBY", match_key, faction_field, -1)
+        redis.call("ZADD", free_spots_key, free - 1, match_id)
+        return {match_id, redis.call("HGET", match_key, "mission")}
+    end
+
+    -- Match expired or index is outdated
+    redis.call("ZREM", free_spots_key, match_id)
+end
+"""
 
-local free = redis.call("HGET", match_key, faction_field)
+join_script = redis.register_named_script("join", JOIN_MATCH_LUA)
+
+# Lua script for fetching queued parties in one round-trip: prunes expired players from queue,
+# reads the oldest parties from each faction and party size bucket and fetches their data.
+# Bucket entries of expired players are removed lazily here, matched or left ones are removed with their queue entry
+FETCH_QUEUE_LUA = """
+local queue_key = KEYS[1]
+local expired_before = ARGV[1]
+local max_parties_per_bucket = tonumber(ARGV[2])
+local player_key_prefix = ARGV[3]
+
+redis.call("ZREMRANGEBYSCORE", queue_key, "-inf", expired_before)
+
+local bucket_sizes = {}
+local player_ids = {}
+for k = 2, #KEYS do
+    local bucket_size = 0
+    for _, player_id in ipairs(redis.call("ZRANGE", KEYS[k], 0, max_parties_per_bucket - 1)) do
+        if redis.call("ZSCORE", queue_key, player_id) then
+            bucket_size = bucket_size + 1
+            table.insert(player_ids, player_id)
+        else
+            redis.call("ZREM", KEYS[k], player_id)
+        end
+    end
+    bucket_sizes[k - 1] = bucket_size
+end
+
+if #player_ids == 0 then
+    return {bucket_sizes, {}, {}}
+end
 
-if not free then
-    return -1
+local player_keys = {}
+for i, player_id in ipairs(player_ids) do
+    player_keys[i] = player_key_prefix .. player_id
 end
 
-free = tonumber(free)
+return {bucket_sizes, player_ids, redis.call("MGET", unpack(player_keys))}
+"""
+
+fetch_queue_script = redis.register_named_script("fetch_queue", FETCH_QUEUE_LUA)
+
+# Lua script for atomic match assignment: notifies matched players (including waiting ones via pub/sub),
+# removes them from queue and party queue buckets of the pool,
+# updates data about the game server and registers ongoing match with its free spots
+ASSIGN_MATCH_LUA = """
+local queue_key = KEYS[1]
+local game_servers_key = KEYS[2]
+local ongoing_match_key = KEYS[3]
+
+local match_details = ARGV[1]
+local match_expiration = ARGV[2]
+local player_key_prefix = ARGV[3]
+local match_for_player_key_prefix = ARGV[4]
+local server = ARGV[5]
+local server_data = ARGV[6]
+local match_id = ARGV[7]
+local match_info = cjson.decode(ARGV[8])
+local match_info_expiration = ARGV[9]
+local free_spots_index = cjson.decode(ARGV[10])
+local match_notifications_channel = ARGV[11]
+local player_pools_key_prefix = ARGV[12]
+local pool_id = ARGV[13]
+
+for i = 14, #ARGV do
+    local player_id = ARGV[i]
+    redis.call("SETEX", match_for_player_key_prefix .. player_id, match_expiration, match_details)
+    redis.call("DEL", player_key_prefix .. player_id)
+    redis.call("ZREM", queue_key, player_id)
+    for k = 4, #KEYS do
+        redis.call("ZREM", KEYS[k], player_id)
+    end
+    redis.call("SREM", player_pools_key_prefix .. player_id, pool_id)
+    redis.call("PUBLISH", match_notifications_channel, player_id)
+end
+
+redis.call("HSET", game_servers_key, server, server_data)
+
+local match_info_fields = {}
+for field, value in pairs(match_info) do
+    table.insert(match_info_fields, field)
+    table.insert(match_info_fields, value)
+end
+redis.call("HSET", ongoing_match_key, unpack(match_info_fields))
+redis.call("EXPIRE", ongoing_match_key, match_info_expiration)
+
+for free_spots_key, free_spots in pairs(free_spots_index) do
+    redis.call("ZADD", free_spots_key, free_spots, match_id)
+    redis.call("EXPIRE", free_spots_key, match_info_expiration)
+end
+
+return #ARGV - 13
+"""
+
+assign_match_script = redis.register_named_script("assign_match", ASSIGN_MATCH_LUA)
+
+# Lua script for removing player from all entered queues (with their party queue buckets) and from assigned match
+LEAVE_QUEUES_LUA = """
+local player_pools_key = KEYS[1]
+local match_for_player_key = KEYS[2]
+
+local player_id = ARGV[1]
+local player_key_prefix = ARGV[2]
+local queue_key_prefix = ARGV[3]
+local party_queue_key_prefix = ARGV[4]
+
+local pool_ids = redis.call("SMEMBERS", player_pools_key)
+for _, pool_id in ipairs(pool_ids) do
+    -- Same format as GET_REDIS_PLAYER_KEY
+    redis.call("DEL", player_key_prefix .. pool_id .. ":" .. player_id)
+    redis.call("ZREM", queue_key_prefix .. pool_id, player_id)
+    -- Same format as GET_REDIS_PARTY_QUEUE_KEY, buckets are given in ARGV after prefixes
+    for i = 5, #ARGV do
+        redis.call("ZREM", party_queue_key_prefix .. pool_id .. ":" .. ARGV[i], player_id)
+    end
+end
+
+redis.call("DEL", player_pools_key, match_for_player_key)
+return #pool_ids
+"""
+
+leave_queues_script = redis.register_named_script("leave_queues", LEAVE_QUEUES_LUA)
+
+
+# Lua script for rate limiting: token buckets for player and IP are refilled and taken from together,
+# so a request rejected by one bucket doesn't spend tokens of another
+RATE_LIMIT_LUA = """
+local now = tonumber(ARGV[1])
+local expiration = tonumber(ARGV[2])
+
+local retry_after = 0
+local buckets = {}
+for i, bucket_key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[1 + i * 2])
+    local burst = tonumber(ARGV[2 + i * 2])
+    local bucket = redis.call("HMGET", bucket_key, "tokens", "ts")
+    local tokens = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    if tokens < 1 then
+        retry_after = math.max(retry_after, (1 - tokens) / rate)
+    end
+    buckets[i] = tokens
+end
+
+if retry_after > 0 then
+    return tostring(retry_after)
+end
+
+for i, bucket_key in ipairs(KEYS) do
+    redis.call("HSET", bucket_key, "tokens", buckets[i] - 1, "ts", now)
+    redis.call("EXPIRE", bucket_key, expiration)
+end
+return "0"
+"""
+
+rate_limit_script = redis.register_named_script("rate_limit", RATE_LIMIT_LUA)
 
-if free > 0 then
-    redis.call("HINCRBY", match_key, faction_field, -1)
-    return 1
-else
-    return 0
+# Lua script for releasing match creation lock only by its owner, so a tick whose lock expired doesn't release
+# the lock taken by another worker since then
+RELEASE_LOCK_LUA = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
 end
+return 0
 """
 
-join_script = redis.register_script(JOIN_MATCH_LUA)
+release_lock_script = redis.register_named_script("release_lock", RELEASE_LOCK_LUA)
 
 
 def GET_REDIS_PLAYER_KEY(pool_id, player_id):
@@ -79,24 +309,49 @@ def GET_REDIS_PLAYER_QUEUE_KEY(pool_id):
     return f"player_queue:{pool_id}"
 
 
+def GET_REDIS_PARTY_QUEUE_BUCKET(faction, party_size):
+    """Faction and party size part of party queue key"""
+    return f"{(faction or 'any').lower()}:{party_size}"
+
+
+def GET_REDIS_PARTY_QUEUE_KEY(pool_id, faction, party_size):
+    """This sorted set stores queued parties (by leader) of one faction and party size by time they entered the queue"""
+    return f"party_queue:{pool_id}:{GET_REDIS_PARTY_QUEUE_BUCKET(faction, party_size)}"
+
+
+def GET_REDIS_PLAYER_POOLS_KEY(player_id):
+    """This set stores pools player is queued in, until it expires"""
+    return f"player_pools:{player_id}"
+
+
+def GET_REDIS_PLAYER_RATE_LIMIT_KEY(player_id):
+    """This hash stores token bucket (tokens, last update time) limiting queue requests of player"""
+    return f"rate_limit:player:{player_id}"
+
+
+def GET_REDIS_IP_RATE_LIMIT_KEY(ip):
+    """This hash stores token bucket (tokens, last update time) limiting queue requests from IP"""
+    return f"rate_limit:ip:{ip}"
+
+
 def GET_REDIS_MATCH_FOR_PLAYER_KEY(player_id):
     """This key stores data about match assigned to player"""
     return f"match:{player_id}"
 
 
+def GET_REDIS_PLAYER_RATING_KEY(player_id):
+    """This key stores rating of player (mu, sigma) pushed by progression backend after matches"""
+    return f"rating:{player_id}"
+
+
 def GET_REDIS_MATCH_CREATION_LOCK_KEY(pool_id):
     """Allow only 1 match creation in time per pool"""
     return f"matchmaking_lock:{pool_id}"
 
 
-def GET_REDIS_GAME_SERVERS_QUEUE_KEY():
-    """In this queue game servers are registered, ordered by amount of free resource units"""
-    return f"game_servers"
-
-
-def GET_REDIS_GAME_SERVER_KEY(server):
-    """Stores information about server"""
-    return f"game_server:{server}"
+def GET_REDIS_GAME_SERVERS_KEY():
+    """This hash stores information about each registered game server (region group, free resources)"""
+    return "game_server_registry"
 
 
 def GET_REDIS_ONGOING_MATCH_KEY(match_id: str):
@@ -104,102 +359,176 @@ def GET_REDIS_ONGOING_MATCH_KEY(match_id: str):
     return f"ongoing_match:{match_id}"
 
 
-def GET_REDIS_ONGOING_MATCH_POOL_KEY(pool_id: str):
-    """Stores a list of ongoing matches for a given pool"""
-    return f"ongoing_matches:{pool_id}"
+def GET_REDIS_ONGOING_MATCH_FREE_SPOTS_KEY(pool_id: str, faction: str):
+    """This sorted set stores ongoing matches of a given pool by free spots amount for faction"""
+    return f"ongoing_match_free_spots:{pool_id}:{faction.lower()}"
+
+
+def GET_REDIS_MATCH_NOTIFICATIONS_CHANNEL():
+    """Pub/sub channel where ids of players who were assigned a match are published"""
+    return "match_notifications"
+
+
+def GET_REDIS_ACTIVE_POOLS_KEY():
+    """Stores a set of pools with queued players, for which matches are created in background"""
+    return "active_pools"
+
+
+def GET_REDIS_FACTION_COUNTS_KEY(pool_id: str):
+    """Stores amounts of queued players by faction, as of the last match creation attempt"""
+    return f"faction_counts:{pool_id}"
+
+
+def GET_REDIS_MATCHMAKING_CONFIG_KEY():
+    """This hash stores active matchmaking config (version, etag, config), shared by all matchmaker workers"""
+    return "matchmaking_config"
+
+
+config_store = MatchmakingConfigStore(MATCHMAKING_CONFIG_URL, MATCHMAKING_CONFIG_SNAPSHOT_PATH, redis=redis,
+                                      redis_key=GET_REDIS_MATCHMAKING_CONFIG_KEY(),
+                                      local_ttl=MATCHMAKING_CONFIG_LOCAL_TTL)
 
 
 async def acquire_match_creation_lock(pool_id):
-    """Locks match creation for pool if isn't locked already, if locked, returns False"""
+    """Locks match creation for pool if isn't locked already, returns lock token or None if locked"""
     lock_key = GET_REDIS_MATCH_CREATION_LOCK_KEY(pool_id)
+    token = str(uuid.uuid4())
     # Set only if it doesn't exist
-    return await redis.set(lock_key, "locked", ex=MATCH_CREATION_LOCK_TIMEOUT, nx=True)
+    if await redis.set(lock_key, token, ex=MATCH_CREATION_LOCK_TIMEOUT, nx=True):
+        return token
+    return None
 
 
-async def release_match_creation_lock(pool_id):
-    """Unlocks match creation for pool"""
+async def release_match_creation_lock(pool_id, token):
+    """Unlocks match creation for pool if lock is still owned by token"""
     lock_key = GET_REDIS_MATCH_CREATION_LOCK_KEY(pool_id)
-    await redis.delete(lock_key)  # Remove lock
+    await release_lock_script(keys=[lock_key], args=[token])
 
 
 async def update_matchmaking_config():
-    """Updates mission data from ecr service backend"""
-    async with httpx.AsyncClient() as client:
-        r = await client.get("https://storage.yandexcloud.net/ecr-service/api/ecr/server_data/matchmaking_config.json")
-        r.raise_for_status()
-        matchmaking_config = r.json()
-        await cache.set("matchmaking_config", matchmaking_config)
+    """Updates mission data from ecr service backend, invalid config is rejected and the active one is kept"""
+    try:
+        await config_store.refresh(http_client)
+    except Exception as e:
+        logger.error(f"Couldn't update matchmaking config, keeping version {config_store.version}: {e}")
 
 
-async def remove_player_from_all_queues(player_id: str):
-    # Remove the player from all queues
-    async for key in redis.scan_iter(f"player:*:{player_id}"):
-        pool_id = key.split(":")[1]  # Extract pool_id from key
+async def run_matchmaking_config_polling():
+    """Checks for matchmaking config changes, so they are applied without restart"""
+    while True:
+        await asyncio.sleep(MATCHMAKING_CONFIG_POLL_INTERVAL)
+        await update_matchmaking_config()
+
+
+async def get_faction_counts(pool_id: str):
+    """Faction counts of pool from Redis, cached locally for a short time as they are asked on every reenter"""
+    faction_counts_key = GET_REDIS_FACTION_COUNTS_KEY(pool_id)
+    faction_counts = await cache.get(faction_counts_key)
+    if faction_counts is None:
+        faction_counts_data = await redis.get(faction_counts_key)
+        faction_counts = json.loads(faction_counts_data) if faction_counts_data else {}
+        await cache.set(faction_counts_key, faction_counts, ttl=FACTION_COUNTS_LOCAL_TTL)
+    return faction_counts
+
 
-        # Remove player specific data
-        await redis.delete(key)
-        await redis.zrem(GET_REDIS_PLAYER_QUEUE_KEY(pool_id), player_id)
+async def check_rate_limit(player_id: str, ip: str):
+    """Takes a token from player and IP buckets, returns 0 if request is allowed, otherwise seconds to wait"""
+    retry_after = await rate_limit_script(
+        keys=[GET_REDIS_PLAYER_RATE_LIMIT_KEY(player_id), GET_REDIS_IP_RATE_LIMIT_KEY(ip)],
+        args=[time.time(), RATE_LIMIT_EXPIRATION, PLAYER_RATE_LIMIT, PLAYER_RATE_BURST, IP_RATE_LIMIT, IP_RATE_BURST]
+    )
+    return float(retry_after)
+
+
+def get_rate_limited_response(retry_after: float):
+    retry_after = max(retry_after, MIN_RETRY_AFTER)
+    return JSONResponse(status_code=429, content={"status": "rate_limited", "retry_after": retry_after},
+                        headers={"Retry-After": str(math.ceil(retry_after))})
+
+
+async def remove_player_from_all_queues(player_id: str):
+    """Removes the player from all entered queues and removes assigned match"""
+    await leave_queues_script(
+        keys=[GET_REDIS_PLAYER_POOLS_KEY(player_id), GET_REDIS_MATCH_FOR_PLAYER_KEY(player_id)],
+        args=[player_id, "player:", GET_REDIS_PLAYER_QUEUE_KEY(""), "party_queue:",
+              *[GET_REDIS_PARTY_QUEUE_BUCKET(faction, party_size) for faction, party_size in PARTY_QUEUE_BUCKETS]]
+    )
 
 
 async def try_create_match(pool_id: str):
     queue_key = GET_REDIS_PLAYER_QUEUE_KEY(pool_id)
 
     version_and_contour, pool_name = pool_id.split(":")
-    matchmaking_config = await cache.get("matchmaking_config", None)
+    matchmaking_config = await config_store.sync()
     if matchmaking_config is None:
-        logger.critical("Matchmaking config not set in cache")
-        return {"status": "server_error"}
-
-    expired_players = await redis.zrangebyscore(queue_key, "-inf", time.time() - PLAYER_EXPIRATION)
+        logger.critical("Matchmaking config not loaded")
+        return {"status": "server_error", "reason": "no_config"}
 
-    # Remove expired players in batches of 1000
-    for i in range(0, len(expired_players), 1000):
-        batch = expired_players[i:i + 1000]
-        await redis.zrem(queue_key, *batch)
-
-    # Fetch enough players to allow faction balancing (2 factions, max 20 players per team)
-    players_and_ts = await redis.zrange(queue_key, 0, 20 * 2 - 1, withscores=True)
+    # Prune expired players and fetch the oldest parties of each faction and size (up to a limit) for team selection
+    bucket_sizes, player_ids, players_data = await fetch_queue_script(
+        keys=[queue_key, *[GET_REDIS_PARTY_QUEUE_KEY(pool_id, faction, party_size)
+                           for faction, party_size in PARTY_QUEUE_BUCKETS]],
+        args=[time.time() - PLAYER_EXPIRATION, MATCH_CREATION_CANDIDATES_PER_BUCKET, GET_REDIS_PLAYER_KEY(pool_id, "")]
+    )
 
     player_data_map = {}
+    # Buckets are concatenated in PARTY_QUEUE_BUCKETS order, each ordered by entered time, so parties of each faction
+    # come ordered for team selection without sorting
+    faction_parties = {}
     faction_counts = {}
     region_group_counts = {}
     oldest_ts = int(time.time())
     newest_ts = 0
 
-    for player_id, queued_ts in players_and_ts:
-        player_key = GET_REDIS_PLAYER_KEY(pool_id, player_id)
-        player_data = await redis.get(player_key)
-        if not player_data:
-            # Skip expired or corrupted players
-            continue
-
-        player_info = json.loads(player_data)
-        player_data_map[player_id] = player_info
-        faction = player_info.get("faction")
-        faction_counts[faction] = faction_counts.get(faction, 0) + 1
-        region_group = player_info.get("region_group")
-        entered_ts = player_info.get("entered_time")
-        region_group_counts[region_group] = region_group_counts.get(region_group, 0) + 1
-        oldest_ts = min(oldest_ts, entered_ts)
-        newest_ts = max(newest_ts, entered_ts)
+    queue_entries = zip(player_ids, players_data)
+    for (faction, party_size), bucket_size in zip(PARTY_QUEUE_BUCKETS, bucket_sizes):
+        for player_id, player_data in islice(queue_entries, bucket_size):
+            if not player_data:
+                # Skip expired or corrupted players
+                continue
+
+            player_info = json.loads(player_data)
+            if player_info.get("faction") != faction or len(player_info["party_members"]) != party_size:
+                # Left from previous entry of the player with another party that expired without leaving the queue,
+                # removed when player leaves the queue or is matched
+                continue
+
+            player_data_map[player_id] = player_info
+            faction_parties.setdefault(faction, []).append((player_id, party_size))
+            faction_counts[faction] = faction_counts.get(faction, 0) + 1
+            region_group = player_info.get("region_group")
+            entered_ts = player_info.get("entered_time")
+            region_group_counts[region_group] = region_group_counts.get(region_group, 0) + 1
+            oldest_ts = min(oldest_ts, entered_ts)
+            newest_ts = max(newest_ts, entered_ts)
+
+    # Ratings of all party members of all candidates in one request, party is rated by average of its members
+    party_members = {player_id: player_info.get("party_members") or [player_id]
+                     for player_id, player_info in player_data_map.items()}
+    rating_keys = [GET_REDIS_PLAYER_RATING_KEY(member) for members in party_members.values() for member in members]
+    ratings = iter(await redis.mget(rating_keys) if rating_keys else [])
+    for player_id, members in party_members.items():
+        members_ratings = [json.loads(rating)["mu"] if rating else DEFAULT_RATING for rating in
+                           [next(ratings) for _ in members]]
+        player_data_map[player_id]["rating"] = sum(members_ratings) / len(members_ratings)
 
     # The largest time player spent in matchmaking right now
     oldest_player_queue_time = time.time() - oldest_ts
     newest_player_queue_time = time.time() - newest_ts
 
-    # Update faction counts in cache
-    await cache.set("faction_counts", faction_counts)
+    # Share faction counts with all workers
+    await redis.setex(GET_REDIS_FACTION_COUNTS_KEY(pool_id), PLAYER_EXPIRATION, json.dumps(faction_counts))
 
     if pool_name == "pvp_casual":
         outcome = try_create_pvp_match_casual(player_data_map, oldest_player_queue_time, newest_player_queue_time,
                                               matchmaking_config["pools"]["pvp"],
-                                              instant_creation=INSTANT_CREATION_MODE)
+                                              instant_creation=INSTANT_CREATION_MODE, faction_parties=faction_parties)
     elif pool_name == "pvp_duels":
         outcome = try_create_pvp_match_duel(player_data_map, oldest_player_queue_time, newest_player_queue_time,
-                                            matchmaking_config["pools"]["pvp"])
+                                            matchmaking_config["pools"]["pvp"], faction_parties=faction_parties)
     elif pool_name == "pve":
         outcome = try_create_pve_match(player_data_map, oldest_player_queue_time, matchmaking_config["pools"]["pve"],
-                                       instant_creation=INSTANT_CREATION_MODE)
+                                       instant_creation=INSTANT_CREATION_MODE, faction_parties=faction_parties)
     else:
         raise NotImplementedError
 
@@ -210,52 +539,39 @@ async def try_create_match(pool_id: str):
                          f"newest time {newest_player_queue_time}")
 
         # Get faction counts dynamically
-        return {"status": "waiting", "faction_counts": faction_counts}
+        return {"status": "waiting", "reason": "waiting", "faction_counts": faction_counts}
 
     players_in_match, match_data = outcome
     mission_data = matchmaking_config["missions"].get(match_data["mission"])
     if not mission_data:
         logger.error(
             f"Couldn't find mission data for {match_data['mission']} in matchmaking config keys ({list(matchmaking_config['missions'].keys())})")
-        return {"status": "waiting", "faction_counts": faction_counts}
+        return {"status": "waiting", "reason": "no_mission", "faction_counts": faction_counts}
 
     resource_units_required = matchmaking_config["resource_units"][match_data["match_type"]]
-    available_servers = await redis.zrangebyscore(GET_REDIS_GAME_SERVERS_QUEUE_KEY(), resource_units_required, "inf",
-                                                  start=0, num=10)
+    servers_data = {server: json.loads(server_data)
+                    for server, server_data in (await redis.hgetall(GET_REDIS_GAME_SERVERS_KEY())).items()}
+    available_servers = order_servers_for_match(region_group_counts, servers_data, resource_units_required)
 
     if FULL_DEBUG_MODE:
-        logger.debug(f"Retrieved {len(available_servers)} available servers for match creation")
+        logger.debug(f"Retrieved {len(available_servers)} available servers out of {len(servers_data)} "
+                     f"for match creation")
 
     if DISABLE_CREATION_MODE:
         if FULL_DEBUG_MODE:
             logger.debug(f"Skipping creation due to DISABLE_CREATION_MODE")
-        return {"status": "waiting", "faction_counts": faction_counts}
+        return {"status": "waiting", "reason": "creation_disabled", "faction_counts": faction_counts}
 
     if not available_servers:
         # No servers available, need to launch new
         logger.error("No servers available to handle match creation, need to launch")
-        return {"status": "waiting", "faction_counts": faction_counts}
+        return {"status": "waiting", "reason": "no_servers", "faction_counts": faction_counts}
     else:
-        servers_to_region_groups = {}
-        for server in available_servers:
-            server_data = await redis.get(GET_REDIS_GAME_SERVER_KEY(server))
-            if server_data:
-                server_data = json.loads(server_data)
-                # Check if server has free ports
-                free_instances_amount = server_data["free_instances_amount"]
-                if free_instances_amount > 0:
-                    region_group = server_data["region_group"]
-                    servers_to_region_groups[server] = region_group
-                else:
-                    logger.warning(f"Skipping server {server} because of low free instances: {free_instances_amount}")
-            else:
-                logger.warning(f"Didn't find server data for server {server}, skipping...")
-
         match_id = str(uuid.uuid4())
         success, successful_server, server_response = await try_to_launch_match(
             logger=logger,
-            region_group_counts=region_group_counts,
-            servers_to_region_groups=servers_to_region_groups,
+            client=http_client,
+            ordered_servers=available_servers,
             resource_units=resource_units_required,
             version_and_contour=version_and_contour,
             game_map=mission_data["map"],
@@ -263,7 +579,9 @@ async def try_create_match(pool_id: str):
             game_mode=mission_data["mode"],
             match_id=match_id,
             faction_setup=match_data["faction_setup"],
-            max_team_size=match_data["max_team_size"]
+            max_team_size=match_data["max_team_size"],
+            hedge_delay=LAUNCH_HEDGE_DELAY or None,
+            timeout=LAUNCH_TIMEOUT
         )
         if success:
             match_details = {
@@ -271,87 +589,167 @@ async def try_create_match(pool_id: str):
                 "mission": match_data["mission"]
             }
 
-            # Notify players and remove them from queue
-            for player_id in players_in_match:
-                if player_id is not None:
-                    await redis.setex(GET_REDIS_MATCH_FOR_PLAYER_KEY(player_id), MATCH_EXPIRATION,
-                                      json.dumps(match_details))
-                    await redis.delete(GET_REDIS_PLAYER_KEY(pool_id, player_id))
-                    await redis.zrem(queue_key, player_id)
-
             # Update data abut game server
             free_resource_units = server_response["free_resource_units"]
             logger.debug(f"Updating data for server {successful_server} for running {match_data['mission']}: "
                          f"free resource units {free_resource_units}, "
                          f"free instances amount {server_response['free_instances_amount']}")
-            await redis.zadd(GET_REDIS_GAME_SERVERS_QUEUE_KEY(), {successful_server: free_resource_units})
-
             server_data = json.dumps({
                 "region_group": get_region_group(server_response["region"]),
+                "free_resource_units": free_resource_units,
                 "free_instances_amount": server_response["free_instances_amount"]
             })
-            await redis.set(GET_REDIS_GAME_SERVER_KEY(successful_server), server_data)
 
             # Register ongoing match with full capacity minus assigned players
-            ongoing_match_key = GET_REDIS_ONGOING_MATCH_KEY(match_id)
-            await redis.sadd(GET_REDIS_ONGOING_MATCH_POOL_KEY(pool_id), match_id)
-
             faction_counts = match_data["faction_counts"]
             max_team_size = match_data["max_team_size"]
             faction_free_spots = {}
+            free_spots_index = {}
 
             for faction, size in faction_counts.items():
                 faction_free_spots[f"faction:{faction.lower()}"] = max_team_size - size
-            await redis.hset(ongoing_match_key, mapping={
+                free_spots_index[GET_REDIS_ONGOING_MATCH_FREE_SPOTS_KEY(pool_id, faction)] = max_team_size - size
+            match_info = {
                 "pool_id": pool_id,
                 "mission": match_data["mission"],
                 **faction_free_spots
-            })
-            await redis.expire(ongoing_match_key, MATCH_INFO_EXPIRATION)
+            }
+
+            # Notify players, remove them from queue, update server and ongoing match data in one go
+            await assign_match_script(
+                keys=[
+                    queue_key,
+                    GET_REDIS_GAME_SERVERS_KEY(),
+                    GET_REDIS_ONGOING_MATCH_KEY(match_id),
+                    *[GET_REDIS_PARTY_QUEUE_KEY(pool_id, faction, party_size)
+                      for faction, party_size in PARTY_QUEUE_BUCKETS]
+                ],
+                args=[
+                    json.dumps(match_details),
+                    MATCH_EXPIRATION,
+                    GET_REDIS_PLAYER_KEY(pool_id, ""),
+                    GET_REDIS_MATCH_FOR_PLAYER_KEY(""),
+                    successful_server,
+                    server_data,
+                    match_id,
+                    json.dumps(match_info),
+                    MATCH_INFO_EXPIRATION,
+                    json.dumps(free_spots_index),
+                    GET_REDIS_MATCH_NOTIFICATIONS_CHANNEL(),
+                    GET_REDIS_PLAYER_POOLS_KEY(""),
+                    pool_id,
+                    *[player_id for player_id in players_in_match if player_id is not None]
+                ]
+            )
+
+            now = time.time()
+            for player_id in players_in_match:
+                if player_id in player_data_map:
+                    TIME_IN_QUEUE.labels(pool_id, "created").observe(now - player_data_map[player_id]["entered_time"])
 
             return {"status": "match", **match_details}
         else:
             logger.error("No server could handle match launch request")
-            return {"status": "waiting", "faction_counts": faction_counts}
+            return {"status": "waiting", "reason": "launch_failed", "faction_counts": faction_counts}
 
 
-async def try_join_existing_match(pool_id: str, player_info: dict):
-    pool_set_key = GET_REDIS_ONGOING_MATCH_POOL_KEY(pool_id)
-    match_ids = await redis.smembers(pool_set_key)
+async def run_pool_ticks(pool_id: str):
+    """Tries to create a match for pool on a fixed cadence until its queue is empty"""
+    queue_key = GET_REDIS_PLAYER_QUEUE_KEY(pool_id)
 
-    faction = player_info["faction"]
+    while True:
+        # Only one instance of matchmaker creates a match for pool at a time
+        lock_token = await acquire_match_creation_lock(pool_id)
+        if lock_token:
+            try:
+                res = await try_create_match(pool_id)
+                MATCH_CREATION_ATTEMPTS.labels(pool_id, res.get("reason", res["status"])).inc()
+                if FULL_DEBUG_MODE:
+                    logger.debug(f"Match creation tick for pool {pool_id}: {res}")
+            except Exception as e:
+                MATCH_CREATION_ATTEMPTS.labels(pool_id, "error").inc()
+                logger.error(f"Match creation tick failed for pool {pool_id}: {e}")
+                logger.error(traceback.format_exc())
+            finally:
+                # Release lock after execution
+                await release_match_creation_lock(pool_id, lock_token)
+
+        queue_depth = await redis.zcard(queue_key)
+        QUEUE_DEPTH.labels(pool_id).set(queue_depth)
+        if not queue_depth:
+            # Nobody left in queue, pool will be activated again by the next player entering it
+            await redis.srem(GET_REDIS_ACTIVE_POOLS_KEY(), pool_id)
+            return
+
+        await asyncio.sleep(MATCHMAKING_TICK_INTERVAL)
+
+
+async def run_matchmaking_scheduler():
+    """Starts background match creation for every active pool that doesn't have it running"""
+    while True:
+        try:
+            for pool_id in await redis.smembers(GET_REDIS_ACTIVE_POOLS_KEY()):
+                task = pool_tick_tasks.get(pool_id)
+                if task is None or task.done():
+                    pool_tick_tasks[pool_id] = asyncio.create_task(run_pool_ticks(pool_id))
+        except Exception as e:
+            logger.error(f"Matchmaking scheduler failed to update pools: {e}")
+            logger.error(traceback.format_exc())
 
-    if FULL_DEBUG_MODE:
-        logger.debug(f"Trying to join match in pool {pool_id} with faction {faction}, found {len(match_ids)} matches")
+        await asyncio.sleep(MATCHMAKING_TICK_INTERVAL)
 
-    for match_id in match_ids:
-        match_key = GET_REDIS_ONGOING_MATCH_KEY(match_id)
 
-        result = await join_script(
-            keys=[match_key],
-            args=[f"faction:{faction.lower()}"]
-        )
+async def listen_to_match_notifications():
+    """Wakes up requests waiting for a match when their player is assigned one"""
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(GET_REDIS_MATCH_NOTIFICATIONS_CHANNEL())
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    for event in match_waiters.get(message["data"], ()):
+                        event.set()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Lost subscription to match notifications, resubscribing: {e}")
+            await asyncio.sleep(1)
 
-        if result == 1:
-            mission = await redis.hget(match_key, "mission")
 
-            if FULL_DEBUG_MODE:
-                logger.debug(f"Found free spot in match {match_id}")
+async def try_join_existing_match(pool_id: str, player_info: dict):
+    faction = player_info["faction"]
 
-            return {
-                "match_id": match_id,
-                "mission": mission
-            }
-        elif result == -1:
-            if FULL_DEBUG_MODE:
-                logger.debug(f"Found expired match {match_id}, removing")
+    if FULL_DEBUG_MODE:
+        logger.debug(f"Trying to join match in pool {pool_id} with faction {faction}")
 
-            await redis.srem(pool_set_key, match_id)
-    return None
+    result = await join_script(
+        keys=[GET_REDIS_ONGOING_MATCH_FREE_SPOTS_KEY(pool_id, faction)],
+        args=[GET_REDIS_ONGOING_MATCH_KEY(""), f"faction:{faction.lower()}"]
+    )
+    if not result:
+        return None
+
+    match_id, mission = result
+    if FULL_DEBUG_MODE:
+        logger.debug(f"Found free spot in match {match_id}")
+
+    return {
+        "match_id": match_id,
+        "mission": mission
+    }
 
 
 @app.post("/reenter_matchmaking_queue")
-async def reenter_matchmaking_queue(body: ReenterMatchmakingRequest):
+async def reenter_matchmaking_queue(request: Request, body: ReenterMatchmakingRequest):
+    retry_after = await check_rate_limit(body.player_id, request.client.host)
+    if retry_after:
+        return get_rate_limited_response(retry_after)
+    return await enter_matchmaking_queue(body)
+
+
+async def enter_matchmaking_queue(body: ReenterMatchmakingRequest):
+    """Adds player to the queue or refreshes their entry, assigns ongoing match if possible"""
     player_id = body.player_id
     pool_name = body.pool_name
     game_version = body.game_version
@@ -387,14 +785,29 @@ async def reenter_matchmaking_queue(body: ReenterMatchmakingRequest):
             "region_group": get_region_group(region),
             "entered_time": int(time.time())
         }
-        await redis.setex(player_key, PLAYER_EXPIRATION, json.dumps(player_info))
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.setex(player_key, PLAYER_EXPIRATION, json.dumps(player_info))
+            # Party enters its faction and size bucket once, by time it entered the queue
+            pipe.zadd(GET_REDIS_PARTY_QUEUE_KEY(pool_id, faction, len(party_members)),
+                      {player_id: player_info["entered_time"]})
+            await pipe.execute()
     else:
         player_info = json.loads(await redis.get(player_key))
 
-    # Extend player expiration
-    await redis.expire(player_key, PLAYER_EXPIRATION)
-    # Set player last update time in player expire queue
-    await redis.zadd(GET_REDIS_PLAYER_QUEUE_KEY(pool_id), {player_id: time.time()})
+    async with redis.pipeline(transaction=False) as pipe:
+        # Extend player expiration
+        pipe.expire(player_key, PLAYER_EXPIRATION)
+        # Set player last update time in player expire queue
+        pipe.zadd(GET_REDIS_PLAYER_QUEUE_KEY(pool_id), {player_id: time.time()})
+        # Bucket of abandoned pool expires with its last player
+        pipe.expire(GET_REDIS_PARTY_QUEUE_KEY(pool_id, player_info["faction"], len(player_info["party_members"])),
+                    PLAYER_EXPIRATION)
+        # Remember the pool for leaving all queues
+        pipe.sadd(GET_REDIS_PLAYER_POOLS_KEY(player_id), pool_id)
+        pipe.expire(GET_REDIS_PLAYER_POOLS_KEY(player_id), PLAYER_EXPIRATION)
+        # Mark pool as active for background match creation
+        pipe.sadd(GET_REDIS_ACTIVE_POOLS_KEY(), pool_id)
+        await pipe.execute()
 
     # Try to join existing match
     existing_match = await try_join_existing_match(pool_id, player_info)
@@ -406,35 +819,65 @@ async def reenter_matchmaking_queue(body: ReenterMatchmakingRequest):
             json.dumps(existing_match)
         )
 
-        await redis.delete(player_key)
-        await redis.zrem(GET_REDIS_PLAYER_QUEUE_KEY(pool_id), player_id)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.delete(player_key)
+            pipe.zrem(GET_REDIS_PLAYER_QUEUE_KEY(pool_id), player_id)
+            pipe.zrem(GET_REDIS_PARTY_QUEUE_KEY(pool_id, player_info["faction"], len(player_info["party_members"])),
+                      player_id)
+            pipe.srem(GET_REDIS_PLAYER_POOLS_KEY(player_id), pool_id)
+            await pipe.execute()
 
+        TIME_IN_QUEUE.labels(pool_id, "joined").observe(time.time() - player_info["entered_time"])
         return {"status": "match", **existing_match}
 
-    # Try to create a match
-    got_lock = await acquire_match_creation_lock(pool_id)
-    if got_lock:
+    # Matches are created in background, so only report the queue status
+    faction_counts = await get_faction_counts(pool_id)
+    retry_after = get_retry_after(sum(faction_counts.values()), MIN_RETRY_AFTER, MAX_RETRY_AFTER,
+                                  RETRY_AFTER_QUEUE_SCALE)
+    return {"status": "waiting", "faction_counts": faction_counts, "retry_after": retry_after}
+
+
+@app.post("/wait_for_match")
+async def wait_for_match(request: Request, body: WaitForMatchRequest):
+    """Same as reenter_matchmaking_queue, but if player is waiting, holds the request until a match is assigned
+    or timeout passes"""
+    player_id = body.player_id
+
+    retry_after = await check_rate_limit(player_id, request.client.host)
+    if retry_after:
+        return get_rate_limited_response(retry_after)
+
+    # Register before entering the queue, so the notification can't be missed
+    event = asyncio.Event()
+    match_waiters.setdefault(player_id, set()).add(event)
+    try:
+        res = await enter_matchmaking_queue(body)
+        if res["status"] != "waiting":
+            return res
+
         try:
-            res = await try_create_match(pool_id)
-        except Exception as e:
-            res = {"status": "server_error"}
-            traceback.print_exc()
-        finally:
-            # Release lock after execution
-            await release_match_creation_lock(pool_id)
-    else:
-        faction_counts = await cache.get("faction_counts")
-        res = {"status": "waiting", "faction_counts": faction_counts}
-    return res
+            await asyncio.wait_for(event.wait(), timeout=body.timeout)
+        except asyncio.TimeoutError:
+            return res
+
+        match_data = await redis.get(GET_REDIS_MATCH_FOR_PLAYER_KEY(player_id))
+        if match_data:
+            match_details = json.loads(match_data)
+            return {"status": "match", **match_details}
+        return res
+    finally:
+        waiters = match_waiters[player_id]
+        waiters.discard(event)
+        if not waiters:
+            del match_waiters[player_id]
 
 
 @app.post("/leave_matchmaking_queue")
 async def leave_matchmaking_queue(body: LeaveMatchmakingRequest):
     player_id = body.player_id
 
+    # Remove from queues and remove match data if exists
     await remove_player_from_all_queues(player_id)
-    # Remove match data if exists
-    await redis.delete(GET_REDIS_MATCH_FOR_PLAYER_KEY(player_id))
     return {"status": "success", "message": "Player removed from queue"}
 
 
@@ -447,13 +890,12 @@ async def register_or_update_game_server(request: Request, body: RegisterGameSer
 
     logger.debug(f"Registering game server {server_ip} ({region_group}): "
                  f"free instances amount {free_instances_amount}, free resource units {free_resource_units}")
-    await redis.zadd(GET_REDIS_GAME_SERVERS_QUEUE_KEY(), {server_ip: free_resource_units})
-
     server_data = json.dumps({
         "region_group": region_group,
+        "free_resource_units": free_resource_units,
         "free_instances_amount": free_instances_amount
     })
-    await redis.set(GET_REDIS_GAME_SERVER_KEY(server_ip), server_data)
+    await redis.hset(GET_REDIS_GAME_SERVERS_KEY(), server_ip, server_data)
     return {"status": "success", "message": "Server registered"}
 
 
@@ -464,10 +906,7 @@ async def update_ongoing_match(
     game_contour: str = Header(None, alias="Game-Contour"),
 ):
     match_key = GET_REDIS_ONGOING_MATCH_KEY(body.match_id)
-    pool_set_key = GET_REDIS_ONGOING_MATCH_POOL_KEY(f"{game_version}-{game_contour}:{body.pool_id}")
-
-    # Store match in pool set
-    await redis.sadd(pool_set_key, body.match_id)
+    pool_id = f"{game_version}-{game_contour}:{body.pool_id}"
 
     # Store free spots per faction
     data = {
@@ -481,8 +920,16 @@ async def update_ongoing_match(
     if FULL_DEBUG_MODE:
         logger.debug(f"Updating match info for {match_key}, data {data}")
 
-    await redis.hset(match_key, mapping=data)
-    await redis.expire(match_key, MATCH_INFO_EXPIRATION)
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.hset(match_key, mapping=data)
+        pipe.expire(match_key, MATCH_INFO_EXPIRATION)
+
+        # Index match by free spots, so joining picks it without iterating all matches
+        for faction, free in body.faction_free_spots.items():
+            free_spots_key = GET_REDIS_ONGOING_MATCH_FREE_SPOTS_KEY(pool_id, faction)
+            pipe.zadd(free_spots_key, {body.match_id: free})
+            pipe.expire(free_spots_key, MATCH_INFO_EXPIRATION)
+        await pipe.execute()
 
     return {"status": "success"}
 
@@ -493,9 +940,7 @@ async def unregister_game_server(request: Request):
 
     logger.debug(f"Unregistering game server {server_ip}")
 
-    server_key = GET_REDIS_GAME_SERVER_KEY(server_ip)
-    await redis.zrem(GET_REDIS_GAME_SERVERS_QUEUE_KEY(), server_ip)
-    await redis.delete(server_key)
+    await redis.hdel(GET_REDIS_GAME_SERVERS_KEY(), server_ip)
 
     return {"status": "success", "message": "Server unregistered"}
 
@@ -507,19 +952,63 @@ async def register_game_server_stats(request: Request, body: RegisterGameServerS
     return {"status": "success", "message": "Stats registered"}
 
 
+@app.post("/update_player_ratings")
+async def update_player_ratings(body: UpdatePlayerRatingsRequest, authorization: str = Header(None)):
+    """Caches ratings sent by progression backend after match results, so match creation doesn't query it"""
+    # Match creation trusts cached ratings, so only progression backend may set them
+    if not BACKEND_API_KEY or not secrets.compare_digest(authorization or "", f"Api-Key {BACKEND_API_KEY}"):
+        return JSONResponse(status_code=401, content={"status": "error", "message": "Not authorized"})
+
+    async with redis.pipeline(transaction=False) as pipe:
+        for rating in body.ratings:
+            pipe.setex(GET_REDIS_PLAYER_RATING_KEY(rating.player_id), PLAYER_RATING_EXPIRATION,
+                       json.dumps({"mu": rating.mu, "sigma": rating.sigma}))
+        await pipe.execute()
+    return {"status": "success", "message": "Ratings updated"}
+
+
 @app.post("/update_matchmaking_config")
 async def update_matchmaking_config_handler(background_tasks: BackgroundTasks):
     background_tasks.add_task(update_matchmaking_config)
     return {"status": "success", "message": "Acknowledged"}
 
 
+@app.get("/matchmaking_config_version")
+async def get_matchmaking_config_version():
+    await config_store.sync()
+    active = config_store.active
+    if active is None:
+        return {"status": "not_loaded"}
+    return {"status": "success", "version": active.version, "etag": active.etag, "source": active.source,
+            "activated_at": int(active.activated_at)}
+
+
 # Cleanup Redis on shutdown
 @app.on_event("shutdown")
 async def shutdown():
+    # Stop background match creation
+    for task in [scheduler_task, match_notifications_task, config_polling_task, *pool_tick_tasks.values()]:
+        if task is not None:
+            task.cancel()
+    await http_client.aclose()
     await redis.close()
+    mark_metrics_process_dead(os.getpid())
 
 
 @app.on_event("startup")
 async def on_startup():
-    # Updates match data
+    global scheduler_task, match_notifications_task, config_polling_task
+
+    # Metrics aren't served on public API port, as they show queue depths and timings
+    if start_metrics_server(METRICS_PORT, METRICS_ADDR):
+        logger.info(f"Serving metrics on {METRICS_ADDR}:{METRICS_PORT}")
+
+    # Last good config is available at once, even if storage isn't, then it's checked for updates
+    config_store.load_snapshot()
+    await config_store.sync(force=True)
     await update_matchmaking_config()
+    config_polling_task = asyncio.create_task(run_matchmaking_config_polling())
+    # Starts background match creation
+    scheduler_task = asyncio.create_task(run_matchmaking_scheduler())
+    # Starts delivering match notifications to waiting requests
+    match_notifications_task = asyncio.create_task(listen_to_match_notifications())
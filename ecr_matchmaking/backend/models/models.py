@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, constr, validator
-from typing import Optional, Literal, List, Tuple
+from pydantic import BaseModel, Field, constr, validator, model_validator
+from typing import Optional, Literal, List, Tuple, Dict
 
 GAME_FACTIONS: Tuple[str, ...] = (
     'LoyalSpaceMarines',
@@ -7,6 +7,7 @@ GAME_FACTIONS: Tuple[str, ...] = (
 )
 
 MAX_PARTY_SIZE = 4
+MAX_RATINGS_PER_UPDATE = 200
 
 
 class ReenterMatchmakingRequest(BaseModel):
@@ -39,6 +40,11 @@ class ReenterMatchmakingRequest(BaseModel):
         return v
 
 
+class WaitForMatchRequest(ReenterMatchmakingRequest):
+    # Seconds to hold the request, less than queue expiration, as player isn't refreshed in queue while waiting
+    timeout: int = Field(20, ge=1, le=25)
+
+
 class LeaveMatchmakingRequest(BaseModel):
     player_id: str
 
@@ -61,3 +67,45 @@ class UpdateOngoingMatchRequest(BaseModel):
     pool_id: str
     faction_free_spots: dict
     mission: str
+
+
+class PlayerRating(BaseModel):
+    player_id: str
+    mu: float
+    sigma: float
+
+
+class UpdatePlayerRatingsRequest(BaseModel):
+    ratings: List[PlayerRating] = Field(max_length=MAX_RATINGS_PER_UPDATE)
+
+
+class MissionConfig(BaseModel):
+    map: str
+    mode: str
+
+
+class MatchmakingConfig(BaseModel):
+    """Matchmaking config from storage, checked before it replaces the active one"""
+    missions: Dict[str, MissionConfig]
+    # Pool type (pvp, pve) -> match group -> match type -> mission -> weight
+    pools: Dict[Literal['pvp', 'pve'], Dict[str, Dict[str, Dict[str, float]]]]
+    resource_units: Dict[str, int]
+    region_groups: Optional[Dict[str, str]] = None
+    region_group_distances: Optional[Dict[str, Dict[str, float]]] = None
+
+    @model_validator(mode='after')
+    def validate_match_types(self):
+        for pool_type in ('pvp', 'pve'):
+            if pool_type not in self.pools:
+                raise ValueError(f"Pool {pool_type} is missing")
+            for match_group, match_types in self.pools[pool_type].items():
+                for match_type, missions in match_types.items():
+                    if match_type not in self.resource_units:
+                        raise ValueError(f"No resource units for match type {match_type} in pool {pool_type} "
+                                         f"{match_group}")
+        return self
+
+    def get_unknown_missions(self):
+        """Missions referenced in pools without mission data, matches with them can't be created"""
+        return sorted({mission for match_groups in self.pools.values() for match_types in match_groups.values()
+                       for missions in match_types.values() for mission in missions if mission not in self.missions})
@@ -0,0 +1,19 @@
+import unittest
+from logic.admission import get_retry_after
+
+
+class TestAdmission(unittest.TestCase):
+    def test_get_retry_after(self):
+        # Empty pool, clients poll at match creation tick rate
+        self.assertEqual(2, get_retry_after(0, 2, 10, 500))
+
+        # Grows with load
+        self.assertEqual(3, get_retry_after(250, 2, 10, 500))
+        self.assertEqual(4, get_retry_after(500, 2, 10, 500))
+
+        # Capped
+        self.assertEqual(10, get_retry_after(100000, 2, 10, 500))
+
+
+if __name__ == "__main__":
+    unittest.main()
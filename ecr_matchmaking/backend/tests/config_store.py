@@ -0,0 +1,155 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+
+import httpx
+
+from logic.config_store import MatchmakingConfigStore
+
+CONFIG = {
+    "missions": {"MineDomination": {"map": "/Game/Maps/Mine", "mode": "pvp"}},
+    "pools": {"pvp": {"PoolAlpha": {"low": {"MineDomination": 1.0}}}, "pve": {}},
+    "resource_units": {"low": 1}
+}
+
+
+class StubStorage:
+    def __init__(self, config, etag):
+        self.config = config
+        self.etag = etag
+        self.status_code = None
+        self.requests = []
+
+    def handle(self, request: httpx.Request):
+        self.requests.append(request)
+        if self.status_code is not None:
+            return httpx.Response(self.status_code)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304)
+        return httpx.Response(200, json=self.config, headers={"ETag": self.etag})
+
+
+class StubRedis:
+    """Hashes of Redis with decoded responses"""
+
+    def __init__(self):
+        self.hashes = {}
+
+    async def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    async def hmget(self, key, fields):
+        return [self.hashes.get(key, {}).get(field) for field in fields]
+
+    async def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+
+class TestConfigStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.snapshot_path = os.path.join(self.tmp_dir.name, "config.json")
+        self.storage = StubStorage(CONFIG, '"v1"')
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(self.storage.handle))
+
+    def tearDown(self):
+        asyncio.run(self.client.aclose())
+        self.tmp_dir.cleanup()
+
+    def refresh(self, store):
+        return asyncio.run(store.refresh(self.client))
+
+    def test_refresh_with_etag(self):
+        store = MatchmakingConfigStore("http://storage/config.json", self.snapshot_path)
+        self.assertIsNone(store.config)
+
+        self.assertTrue(self.refresh(store))
+        self.assertEqual(CONFIG, store.config)
+        version = store.version
+
+        # Unchanged config isn't downloaded again
+        self.assertFalse(self.refresh(store))
+        self.assertEqual('"v1"', self.storage.requests[-1].headers["If-None-Match"])
+        self.assertEqual(version, store.version)
+
+        # New version is swapped in
+        self.storage.config = {**CONFIG, "resource_units": {"low": 2}}
+        self.storage.etag = '"v2"'
+        self.assertTrue(self.refresh(store))
+        self.assertEqual(2, store.config["resource_units"]["low"])
+        self.assertNotEqual(version, store.version)
+
+    def test_invalid_config_is_rejected(self):
+        store = MatchmakingConfigStore("http://storage/config.json", self.snapshot_path)
+        self.refresh(store)
+        version = store.version
+
+        # Match type without resource units
+        self.storage.config = {**CONFIG, "resource_units": {}}
+        self.storage.etag = '"v2"'
+        self.assertRaises(ValueError, self.refresh, store)
+        self.assertEqual(version, store.version)
+
+        # Storage is down
+        self.storage.status_code = 503
+        self.assertRaises(httpx.HTTPStatusError, self.refresh, store)
+        self.assertEqual(version, store.version)
+
+    def test_snapshot(self):
+        store = MatchmakingConfigStore("http://storage/config.json", self.snapshot_path)
+        self.assertFalse(store.load_snapshot())
+        self.refresh(store)
+
+        # Restarted instance has config before storage is asked
+        restarted_store = MatchmakingConfigStore("http://storage/config.json", self.snapshot_path)
+        self.assertTrue(restarted_store.load_snapshot())
+        self.assertEqual(store.version, restarted_store.version)
+        self.assertEqual("snapshot", restarted_store.active.source)
+
+        requests_amount = len(self.storage.requests)
+        self.assertFalse(self.refresh(restarted_store))
+        self.assertEqual(requests_amount + 1, len(self.storage.requests))
+
+        # Broken snapshot is ignored
+        with open(self.snapshot_path, "w") as f:
+            f.write("{")
+        self.assertFalse(MatchmakingConfigStore("http://storage/config.json", self.snapshot_path).load_snapshot())
+
+        with open(self.snapshot_path, "w") as f:
+            json.dump({"config": {"missions": {}}}, f)
+        self.assertFalse(MatchmakingConfigStore("http://storage/config.json", self.snapshot_path).load_snapshot())
+
+    def test_old_snapshot_not_published(self):
+        redis = StubRedis()
+        old_store = MatchmakingConfigStore("http://storage/config.json", self.snapshot_path, redis=redis,
+                                           redis_key="config")
+        self.refresh(old_store)
+        old_version = old_store.version
+
+        # Config changed in storage, Redis was flushed, worker restarted with old snapshot
+        self.storage.config = {**CONFIG, "resource_units": {"low": 2}}
+        self.storage.etag = '"v2"'
+        redis.hashes.clear()
+        store = MatchmakingConfigStore("http://storage/config.json", self.snapshot_path, redis=redis,
+                                       redis_key="config")
+        store.load_snapshot()
+        asyncio.run(store.sync(force=True))
+        self.assertEqual(old_version, store.version)
+        self.assertEqual({}, redis.hashes)
+
+        # Published only once confirmed by storage, then other workers switch to it
+        self.assertTrue(self.refresh(store))
+        self.assertEqual(store.version, redis.hashes["config"]["version"])
+        asyncio.run(old_store.sync(force=True))
+        self.assertEqual(store.version, old_store.version)
+
+        # Unchanged config is published again after Redis is flushed
+        redis.hashes.clear()
+        self.assertFalse(self.refresh(store))
+        self.assertEqual(store.version, redis.hashes["config"]["version"])
+
+
+if __name__ == "__main__":
+    unittest.main()
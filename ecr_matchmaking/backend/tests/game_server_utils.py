@@ -0,0 +1,159 @@
+import time
+import asyncio
+import logging
+import unittest
+
+import httpx
+
+from logic import game_server_utils
+from logic.game_server_utils import order_servers_for_match, try_to_launch_match
+
+LAUNCH_RESPONSE = {
+    "acknowledged": True,
+    "region": "DE",
+    "free_instances_amount": 1,
+    "free_resource_units": 4,
+    "taken_resource_units": 4,
+    "total_resource_units": 8
+}
+
+
+class StubGameServers:
+    def __init__(self, delays=None, answer_after=None, status_codes=None):
+        self.delays = delays or {}
+        self.answer_after = answer_after or {}
+        self.status_codes = status_codes or {}
+        self.requests = []
+        self.launch_received = {}
+        self.launches_in_flight = {}
+        self.max_launches_in_flight = {}
+
+    async def handle(self, request: httpx.Request):
+        server = request.url.host
+        self.requests.append((server, request.url.path))
+        if request.url.path == "/launch":
+            self.launch_received.setdefault(server, asyncio.Event()).set()
+            self.launches_in_flight[server] = self.launches_in_flight.get(server, 0) + 1
+            self.max_launches_in_flight[server] = max(self.max_launches_in_flight.get(server, 0),
+                                                      self.launches_in_flight[server])
+
+            if server in self.answer_after:
+                # Answer only after another server received launch
+                await self.launch_received.setdefault(self.answer_after[server], asyncio.Event()).wait()
+            try:
+                if server in self.delays:
+                    await asyncio.sleep(self.delays[server])
+            finally:
+                self.launches_in_flight[server] -= 1
+
+        status_code = self.status_codes.get(server, 200)
+        if request.url.path == "/launch" and status_code == 200:
+            return httpx.Response(200, json=LAUNCH_RESPONSE)
+        return httpx.Response(status_code, json={"acknowledged": True})
+
+
+class TestGameServerUtils(unittest.TestCase):
+    def test_order_servers_for_match(self):
+        servers_data = {
+            "ru1": {"region_group": "RU", "free_resource_units": 10, "free_instances_amount": 2},
+            "eu1": {"region_group": "EU", "free_resource_units": 4, "free_instances_amount": 2},
+            "eu2": {"region_group": "EU", "free_resource_units": 8, "free_instances_amount": 1},
+            "eu3": {"region_group": "EU", "free_resource_units": 8, "free_instances_amount": 3},
+        }
+
+        # Closest region first, then most free resource units, then most free instances
+        self.assertListEqual(["eu3", "eu2", "eu1", "ru1"],
+                             order_servers_for_match({"EU": 3, "RU": 1}, servers_data, 2))
+        self.assertListEqual(["ru1", "eu3", "eu2", "eu1"],
+                             order_servers_for_match({"RU": 3}, servers_data, 2))
+
+        # Not enough free resource units
+        self.assertListEqual(["ru1", "eu3", "eu2"], order_servers_for_match({"RU": 3}, servers_data, 5))
+
+        # No free instances
+        servers_data["ru1"]["free_instances_amount"] = 0
+        self.assertListEqual(["eu3", "eu2"], order_servers_for_match({"RU": 3}, servers_data, 5))
+
+        # Region too far from players
+        servers_data = {
+            "ea1": {"region_group": "EA", "free_resource_units": 10, "free_instances_amount": 2},
+        }
+        self.assertListEqual([], order_servers_for_match({"EU": 3}, servers_data, 2))
+
+        # No servers
+        self.assertListEqual([], order_servers_for_match({"EU": 3}, {}, 2))
+
+
+    def launch(self, stub, servers, hedge_delay, timeout=None, matches_amount=1):
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(stub.handle)) as client:
+                results = await asyncio.gather(*[
+                    try_to_launch_match(logging.getLogger(__name__), client, servers, 4, "1.0.0.0-dev",
+                                        "/Game/Maps/Mine", "MineDomination", "pvp", f"match{i + 1}",
+                                        "LoyalSpaceMarines-ChaosSpaceMarines", 10, hedge_delay=hedge_delay,
+                                        timeout=timeout)
+                    for i in range(matches_amount)
+                ])
+                await asyncio.gather(*game_server_utils.release_tasks)
+                return results[0] if matches_amount == 1 else results
+
+        return asyncio.run(run())
+
+    def test_launch_without_hedging(self):
+        stub = StubGameServers()
+        success, server, response = self.launch(stub, ["a", "b"], hedge_delay=1)
+        self.assertTrue(success)
+        self.assertEqual("a", server)
+        self.assertDictEqual(LAUNCH_RESPONSE, response)
+        self.assertListEqual([("a", "/launch")], stub.requests)
+
+    def test_launch_releases_slow_server(self):
+        # First server received launch, but answers after hedged one
+        stub = StubGameServers(delays={"a": 0.5})
+        success, server, _ = self.launch(stub, ["a", "b"], hedge_delay=0.05)
+        self.assertTrue(success)
+        self.assertEqual("b", server)
+        self.assertIn(("a", "/stop"), stub.requests)
+        self.assertNotIn(("b", "/stop"), stub.requests)
+
+    def test_launch_releases_server_that_also_answered(self):
+        # Both servers acknowledge launch, the one that didn't win must release it
+        stub = StubGameServers(answer_after={"a": "b"})
+        success, server, _ = self.launch(stub, ["a", "b"], hedge_delay=0.05)
+        self.assertTrue(success)
+        loser = "b" if server == "a" else "a"
+        self.assertIn(("a", "/launch"), stub.requests)
+        self.assertIn(("b", "/launch"), stub.requests)
+        self.assertIn((loser, "/stop"), stub.requests)
+        self.assertNotIn((server, "/stop"), stub.requests)
+
+    def test_launch_failed_server_not_released(self):
+        stub = StubGameServers(status_codes={"a": 503})
+        success, server, _ = self.launch(stub, ["a", "b"], hedge_delay=1)
+        self.assertTrue(success)
+        self.assertEqual("b", server)
+        self.assertListEqual([("a", "/launch"), ("b", "/launch")], stub.requests)
+
+        stub = StubGameServers(status_codes={"a": 503, "b": 503})
+        self.assertTupleEqual((False, None, None), self.launch(stub, ["a", "b"], hedge_delay=1))
+
+    def test_launch_timeout(self):
+        # Neither server answers in time, so launch fails within timeout and both servers release the match
+        stub = StubGameServers(delays={"a": 2, "b": 2})
+        started = time.perf_counter()
+        self.assertTupleEqual((False, None, None), self.launch(stub, ["a", "b"], hedge_delay=0.05, timeout=0.2))
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertIn(("a", "/stop"), stub.requests)
+        self.assertIn(("b", "/stop"), stub.requests)
+
+    def test_launches_to_server_serialized(self):
+        # Matches of different pools are launched at the same time on the same server
+        stub = StubGameServers(delays={"a": 0.05})
+        results = self.launch(stub, ["a"], hedge_delay=None, matches_amount=3)
+        self.assertListEqual([True] * 3, [success for success, _, _ in results])
+        self.assertEqual(3, stub.requests.count(("a", "/launch")))
+        self.assertEqual(1, stub.max_launches_in_flight["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
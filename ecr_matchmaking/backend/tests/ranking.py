@@ -0,0 +1,83 @@
+import os
+import json
+import unittest
+
+import numpy as np
+
+from logic.ranking import quality_batch, quality_from_sums, rate_matches, TEAM1_WON, TEAM2_WON, DRAW
+
+# Matches with expected new ratings, also checked against rating module of progression backend (tools/rating.py)
+RATING_VECTORS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rating_vectors.json")
+
+
+class TestRanking(unittest.TestCase):
+    # Reference values are computed with trueskill package using mpmath backend
+
+    def test_quality_batch(self):
+        mus = [25, 30, 20, 28, 40]
+        sigmas = [8.333, 5, 3, 7, 1]
+        teams = [
+            [1, 1, -1, -1, 0],
+            [1, 1, -1, -1, -1],
+        ]
+        quality = quality_batch(mus, sigmas, teams)
+        self.assertAlmostEqual(0.5009591535097533, quality[0], places=9)
+        self.assertAlmostEqual(0.062322376996211765, quality[1], places=9)
+
+        # Same as from sums
+        self.assertAlmostEqual(quality[0], quality_from_sums(7, 8.333 ** 2 + 5 ** 2 + 3 ** 2 + 7 ** 2, 4), places=12)
+
+    def test_rate_matches(self):
+        mus = [25, 30, 20, 28,
+               25, 25,
+               35, 33, 20, 18,
+               45, 10]
+        sigmas = [8.333, 5, 3, 7,
+                  8.333, 8.333,
+                  2, 3, 3, 2,
+                  1, 1]
+        match_indexes = [0, 0, 0, 0, 1, 1, 2, 2, 2, 2, 3, 3]
+        teams = [1, 1, -1, -1, 1, -1, 1, 1, -1, -1, 1, -1]
+        outcomes = [TEAM1_WON, DRAW, DRAW, TEAM2_WON]
+
+        new_mus, new_sigmas = rate_matches(mus, sigmas, match_indexes, teams, outcomes)
+
+        expected_mus = [27.620392681219844, 30.943584531306907, 19.660141866952223, 26.150825871304402,
+                        25.0, 25.0,
+                        33.74568668767826, 30.18051236381057, 22.819487636189425, 19.25431331232174,
+                        43.99359934106893, 11.006400658931069]
+        expected_sigmas = [7.595909452050672, 4.845990044549547, 2.968050968838242, 6.5693630753169625,
+                           6.457291927957438, 6.457291927957438,
+                           1.9594395249349876, 2.856641328487693, 2.856641328487693, 1.9594395249349876,
+                           0.9899627305426151, 0.9899627305426151]
+        np.testing.assert_allclose(expected_mus, new_mus, rtol=1e-9)
+        np.testing.assert_allclose(expected_sigmas, new_sigmas, rtol=1e-9)
+
+    def test_rate_matches_upset(self):
+        # Underdog won against much stronger player, float math doesn't lose precision
+        new_mus, new_sigmas = rate_matches([10, 60], [1, 1], [0, 0], [1, -1], [TEAM1_WON])
+        self.assertAlmostEqual(11.410, new_mus[0], places=3)
+        self.assertAlmostEqual(58.590, new_mus[1], places=3)
+        self.assertAlmostEqual(0.990, new_sigmas[0], places=3)
+
+    def test_shared_rating_vectors(self):
+        with open(RATING_VECTORS_PATH) as f:
+            matches = json.load(f)["matches"]
+
+        mus, sigmas, match_indexes, teams, expected = [], [], [], [], []
+        for i, match in enumerate(matches):
+            for team, sign in ((match["winners"], 1), (match["losers"], -1)):
+                for player, (mu, sigma) in team.items():
+                    mus.append(mu)
+                    sigmas.append(sigma)
+                    match_indexes.append(i)
+                    teams.append(sign)
+                    expected.append(match["expected"][player])
+
+        new_mus, new_sigmas = rate_matches(mus, sigmas, match_indexes, teams, [TEAM1_WON] * len(matches))
+        np.testing.assert_allclose([mu for mu, _ in expected], new_mus, rtol=1e-9)
+        np.testing.assert_allclose([sigma for _, sigma in expected], new_sigmas, rtol=1e-9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,9 @@
 import os
 import unittest
 import time
-from logic.regions import get_region_group_ordered, get_region_group_distance_map, get_region_group
+from logic import regions
+from logic.regions import get_region_group_ordered, get_region_group_distance_map, get_region_group, \
+    update_region_graph
 
 os.environ["DEBUG_REGION_DISTANCES"] = "1"
 
@@ -63,6 +65,31 @@ class TestRegions(unittest.TestCase):
                                                          distance_map)
         self.assertListEqual(["RU"], ordered_server_groups)
 
+    def test_unknown_region_group(self):
+        self.assertRaises(ValueError, get_region_group_distance_map, "xx")
+        self.assertEqual("EU", get_region_group("xx"))
+
+        # Unknown server groups are skipped
+        self.assertListEqual(["EU"], get_region_group_ordered({"eu": 3}, ["xx", "eu"]))
+
+    def test_update_region_graph(self):
+        graph = regions.region_graph
+        try:
+            # EA becomes reachable from US, new region is added to EA
+            update_region_graph(
+                region_groups={**{r: g for r, g in graph.region_to_group.items() if r == r.upper()}, "XX": "EA"},
+                region_group_distances={**graph.to_distance_map(), "EA": {"EA": 0, "US": 2}}
+            )
+            self.assertEqual("EA", get_region_group("xx"))
+            self.assertListEqual(["US", "EA"], get_region_group_ordered({"us": 3, "ea": 1}, ["ea", "us"]))
+
+            # Only distances are updated, region groups are kept
+            update_region_graph(region_group_distances=graph.to_distance_map())
+            self.assertEqual("EA", get_region_group("xx"))
+            self.assertListEqual(["US"], get_region_group_ordered({"us": 3}, ["ea", "us"]))
+        finally:
+            regions.region_graph = graph
+
 
 if __name__ == "__main__":
     unittest.main()
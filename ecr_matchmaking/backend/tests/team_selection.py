@@ -0,0 +1,100 @@
+import time
+import random
+import unittest
+from logic.team_selection import FactionCandidates, select_teams, fill_team
+from logic.common import group_parties_by_faction
+
+import numpy as np
+
+
+class TestTeamSelection(unittest.TestCase):
+    def test_fill_team(self):
+        party_sizes = np.array([4, 3, 2, 1, 1])
+        order = np.arange(5)
+
+        self.assertListEqual([True, True, True, True, False], list(fill_team(party_sizes, order, 10)))
+        # Party of 2 doesn't fit after 4 + 3, but single players do
+        self.assertListEqual([True, True, False, True, False], list(fill_team(party_sizes, order, 8)))
+        self.assertListEqual([False] * 5, list(fill_team(party_sizes, order, 0)))
+
+    def test_select_teams_keeps_greedy_without_ratings(self):
+        # Larger parties first, then queue order
+        faction1 = FactionCandidates([1, 3, 1, 1], [25] * 4, [None] * 4, [0] * 4)
+        faction2 = FactionCandidates([2, 2, 1], [25] * 3, [None] * 3, [0] * 3)
+        selected1, selected2 = select_teams(faction1, faction2, 4)
+        self.assertListEqual([True, True, False, False], list(selected1))
+        self.assertListEqual([True, True, False], list(selected2))
+
+    def test_group_parties_by_faction(self):
+        # Same order as party queue buckets: larger parties first, then by entered time
+        player_data_map = {
+            "a": {"faction": "A", "party_members": ["a"], "entered_time": 0},
+            "b": {"faction": "A", "party_members": ["b", "b1"], "entered_time": 5},
+            "c": {"faction": "B", "party_members": ["c"], "entered_time": 3},
+            "d": {"faction": "A", "party_members": ["d"], "entered_time": 1},
+            "e": {"faction": "A", "party_members": ["e", "e1"], "entered_time": 2},
+        }
+        faction_parties = group_parties_by_faction(player_data_map)
+        self.assertListEqual([("e", 2), ("b", 2), ("a", 1), ("d", 1)], faction_parties["A"])
+        self.assertListEqual([("c", 1)], faction_parties["B"])
+
+        # Ordered candidates are selected the same way without sorting
+        faction1 = FactionCandidates([3, 1, 1, 1], [25] * 4, [None] * 4, [0] * 4)
+        faction2 = FactionCandidates([2, 2, 1], [25] * 3, [None] * 3, [0] * 3)
+        selected1, selected2 = select_teams(faction1, faction2, 4, ordered=True)
+        self.assertListEqual([True, True, False, False], list(selected1))
+        self.assertListEqual([True, True, False], list(selected2))
+
+    def test_select_teams_balances_skill(self):
+        # Strong single player of faction 1 is swapped with an average one entered at the same time
+        faction1 = FactionCandidates([1, 1, 1], [40, 25, 25], ["EU"] * 3, [0, 0, 0])
+        faction2 = FactionCandidates([1, 1], [25, 25], ["EU"] * 2, [0, 0])
+        selected1, selected2 = select_teams(faction1, faction2, 2)
+        self.assertListEqual([False, True, True], list(selected1))
+        self.assertListEqual([True, True], list(selected2))
+
+        # Parties are swapped only with parties of the same size
+        faction1 = FactionCandidates([2, 1, 1], [40, 25, 25], ["EU"] * 3, [0, 0, 0])
+        selected1, _ = select_teams(faction1, faction2, 2)
+        self.assertListEqual([True, False, False], list(selected1))
+
+    def test_select_teams_prefers_close_regions(self):
+        # Oldest player is from EU, so player from EA is replaced with one from EU
+        faction1 = FactionCandidates([1, 1], [25, 25], ["EU", "EU"], [0, 1])
+        faction2 = FactionCandidates([1, 1, 1], [25, 25, 25], ["EU", "EA", "EU"], [1, 1, 2])
+        selected1, selected2 = select_teams(faction1, faction2, 2)
+        self.assertListEqual([True, True], list(selected1))
+        self.assertListEqual([True, False, True], list(selected2))
+
+    def test_select_teams_prefers_waiting_players(self):
+        # Small skill improvement doesn't justify leaving out player waiting for a long time
+        faction1 = FactionCandidates([1, 1], [25, 26], ["EU", "EU"], [0, 300])
+        faction2 = FactionCandidates([1], [25], ["EU"], [0])
+        selected1, _ = select_teams(faction1, faction2, 1)
+        self.assertListEqual([True, False], list(selected1))
+
+    def test_select_teams_large_pool(self):
+        random.seed(0)
+        amount = 2000
+
+        def random_candidates():
+            return FactionCandidates([random.choice([1, 1, 1, 2, 3, 4]) for _ in range(amount)],
+                                     [random.gauss(25, 8) for _ in range(amount)],
+                                     [random.choice(["EU", "RU", "US"]) for _ in range(amount)],
+                                     [random.randint(0, 120) for _ in range(amount)])
+
+        faction1, faction2 = random_candidates(), random_candidates()
+        start = time.perf_counter()
+        selected1, selected2 = select_teams(faction1, faction2, 20)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(20, faction1.party_sizes[selected1].sum())
+        self.assertEqual(20, faction2.party_sizes[selected2].sum())
+
+        # Same queue gives the same teams
+        repeated1, repeated2 = select_teams(faction1, faction2, 20)
+        self.assertListEqual(list(selected1), list(repeated1))
+        self.assertListEqual(list(selected2), list(repeated2))
+
+
+if __name__ == "__main__":
+    unittest.main()
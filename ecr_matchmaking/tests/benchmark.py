@@ -0,0 +1,189 @@
+# Benchmark of matchmaking backend: runs the app in-process against a local Redis with stub game servers
+# and drives simulated players through the queue, reporting request latency, time to match and Redis load.
+# Redis database is flushed before the run, so never point it to production Redis.
+#
+# Usage (from ecr_matchmaking directory, with Redis running on localhost):
+#   REDIS_PASSWORD=... python tests/benchmark.py --players 2000 --servers 20
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import statistics
+
+os.environ.setdefault("REDIS_HOST", "localhost")
+if os.environ["REDIS_HOST"] not in ("localhost", "127.0.0.1"):
+    sys.exit("Benchmark flushes Redis, run it only against local Redis")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import httpx
+
+import main
+from models.models import GAME_FACTIONS
+
+MATCHMAKING_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "ecr_service", "api",
+                                       "ecr", "server_data", "matchmaking_config.json")
+GAME_VERSION = "1.0.0.0"
+GAME_CONTOUR = "dev"
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+class StubGameServers:
+    """Imitates /launch and /stop endpoints of game servers, keeping track of their free resources"""
+
+    def __init__(self, servers_amount, resource_units, instances_amount):
+        self.servers = {
+            f"10.0.{i // 250}.{i % 250 + 1}": {"free_resource_units": resource_units,
+                                               "free_instances_amount": instances_amount}
+            for i in range(servers_amount)
+        }
+        self.launches = 0
+        self.launched_matches = {}
+
+    async def handle(self, request: httpx.Request):
+        server = self.servers[request.url.host]
+        body = json.loads(request.content)
+        if request.url.path == "/stop":
+            # Hedged launch that lost the race
+            resource_units = self.launched_matches.pop((request.url.host, body["match_unique_id"]), None)
+            if resource_units is not None:
+                server["free_instances_amount"] += 1
+                server["free_resource_units"] += resource_units
+                self.launches -= 1
+            return httpx.Response(200, json={"acknowledged": True, "stopped": resource_units is not None})
+
+        if server["free_instances_amount"] <= 0 or server["free_resource_units"] < body["resource_units"]:
+            return httpx.Response(503, json={"detail": "No free ports available"})
+
+        server["free_instances_amount"] -= 1
+        server["free_resource_units"] -= body["resource_units"]
+        self.launched_matches[(request.url.host, body["match_unique_id"])] = body["resource_units"]
+        self.launches += 1
+        return httpx.Response(200, json={
+            "acknowledged": True,
+            "region": "DE",
+            **server
+        })
+
+
+async def redis_commands_processed():
+    return (await main.redis.info("stats"))["total_commands_processed"]
+
+
+async def simulate_player(client, player_id, pool_name, poll_interval, long_poll, deadline, results):
+    await asyncio.sleep(random.uniform(0, poll_interval))
+
+    body = {
+        "player_id": player_id,
+        "region": random.choice(["de", "ru", "us"]),
+        "pool_name": pool_name,
+        "game_version": GAME_VERSION,
+        "game_contour": GAME_CONTOUR,
+        "desired_match_group": "PoolAlpha",
+        "faction": random.choice(GAME_FACTIONS),
+        "party_members": []
+    }
+    url = "/wait_for_match" if long_poll else "/reenter_matchmaking_queue"
+
+    entered_time = time.perf_counter()
+    while time.perf_counter() < deadline:
+        request_start = time.perf_counter()
+        r = await client.post(url, json=body)
+        results["latencies"].append(time.perf_counter() - request_start)
+        results["requests"] += 1
+
+        if r.status_code == 429:
+            results["rate_limited"] += 1
+            await asyncio.sleep(r.json()["retry_after"])
+            continue
+        if r.json().get("status") == "match":
+            results["times_to_match"].append(time.perf_counter() - entered_time)
+            return
+        if not long_poll:
+            await asyncio.sleep(poll_interval)
+    results["unmatched"] += 1
+
+
+async def run_benchmark(players, servers, pools, poll_interval, long_poll, duration):
+    with open(MATCHMAKING_CONFIG_PATH) as f:
+        matchmaking_config = json.load(f)
+
+    async def keep_local_matchmaking_config():
+        pass
+
+    # Game servers are stubbed in the shared http client, config is taken from this repository
+    stub_servers = StubGameServers(servers, resource_units=100, instances_amount=20)
+    main.http_client = httpx.AsyncClient(transport=httpx.MockTransport(stub_servers.handle))
+    main.config_store.load_snapshot = lambda: main.config_store.activate(matchmaking_config, source="benchmark")
+    main.update_matchmaking_config = keep_local_matchmaking_config
+    # All simulated players come from one IP
+    main.IP_RATE_LIMIT = main.IP_RATE_BURST = players * 10
+
+    await main.redis.flushdb()
+    await main.on_startup()
+
+    for server, server_data in stub_servers.servers.items():
+        transport = httpx.ASGITransport(app=main.app, client=(server, 3000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://matchmaking") as server_client:
+            r = await server_client.post("/register_or_update_game_server", json={
+                "region": random.choice(["DE", "RU"]),
+                "resource_units": 100,
+                **server_data
+            })
+            r.raise_for_status()
+
+    results = {"latencies": [], "times_to_match": [], "requests": 0, "unmatched": 0, "rate_limited": 0}
+    commands_before = await redis_commands_processed()
+    started = time.perf_counter()
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://matchmaking", timeout=60) as client:
+        await asyncio.gather(*[
+            simulate_player(client, str(uuid.uuid4()), random.choice(pools), poll_interval, long_poll,
+                            started + duration, results)
+            for _ in range(players)
+        ])
+
+    elapsed = time.perf_counter() - started
+    commands = await redis_commands_processed() - commands_before
+    await main.shutdown()
+
+    latencies_ms = [latency * 1000 for latency in results["latencies"]]
+    print(f"Players: {players}, servers: {servers}, pools: {', '.join(pools)}, "
+          f"mode: {'long-poll' if long_poll else 'poll'}, elapsed {elapsed:.1f} s")
+    print(f"Requests: {results['requests']} ({results['requests'] / elapsed:.0f} rps), "
+          f"latency p50 {percentile(latencies_ms, 50):.1f} ms, p99 {percentile(latencies_ms, 99):.1f} ms, "
+          f"rate limited {results['rate_limited']}")
+    print(f"Matched: {len(results['times_to_match'])}, unmatched: {results['unmatched']}, "
+          f"launches: {stub_servers.launches}")
+    if results["times_to_match"]:
+        print(f"Time to match: p50 {percentile(results['times_to_match'], 50):.1f} s, "
+              f"p99 {percentile(results['times_to_match'], 99):.1f} s, "
+              f"mean {statistics.mean(results['times_to_match']):.1f} s")
+    print(f"Redis commands: {commands} ({commands / max(results['requests'], 1):.1f} per request, "
+          f"including background match creation)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--servers", type=int, default=10)
+    parser.add_argument("--pools", type=str, nargs="+", default=["pvp_casual", "pvp_duels"])
+    parser.add_argument("--poll_interval", type=float, default=3)
+    parser.add_argument("--long_poll", action="store_true", help="Use /wait_for_match instead of polling")
+    parser.add_argument("--duration", type=float, default=120, help="Max seconds to wait for players to be matched")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.players, args.servers, args.pools, args.poll_interval, args.long_poll,
+                              args.duration))
@@ -21,8 +21,13 @@ class WebAppUser(HttpUser):
         """
         data = {
             "player_id": self.player_id,
-            "pool_id": "prod",
-            "desired_match": "carmine_group"
+            "region": "de",
+            "pool_name": "pvp_casual",
+            "game_version": "1.0.0.0",
+            "game_contour": "dev",
+            "desired_match_group": "PoolAlpha",
+            "faction": "LoyalSpaceMarines",
+            "party_members": []
         }
         self.client.post("/reenter_matchmaking_queue", json=data)
 
@@ -0,0 +1,208 @@
+# Offline simulator of match creation: replays player arrivals (recorded or synthetic) through the real team size
+# and team selection code of backend/logic in simulated time, and reports wait times, match sizes and faction balance.
+# Only match creation is simulated: no game servers, no joining ongoing matches, players don't leave the queue
+# unless --patience is set.
+#
+# Trace is a JSON lines file, one arrival per line:
+#   {"time": 12.5, "player_id": "p1", "faction": "LoyalSpaceMarines", "party_size": 2, "region": "de",
+#    "desired_match_group": "PoolAlpha", "rating": 27.1}
+# where time is seconds from the start of the trace, only time and faction are required.
+#
+# Usage (from ecr_matchmaking directory):
+#   python tests/simulator.py --pool pvp_casual --rate 20 --duration 3600
+#   python tests/simulator.py --pool pvp_casual --trace arrivals.jsonl
+
+import os
+import sys
+import json
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from models.models import GAME_FACTIONS
+from logic.pvp_casual import try_create_pvp_match_casual
+from logic.pvp_duels import try_create_pvp_match_duel
+from logic.pve import try_create_pve_match
+from logic.regions import get_region_group
+
+MATCHMAKING_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "ecr_service", "api",
+                                       "ecr", "server_data", "matchmaking_config.json")
+TICK_INTERVAL = 2  # Same as default MATCHMAKING_TICK_INTERVAL of backend
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def generate_trace(rate, duration, party_sizes_weights, faction_weights, regions):
+    """Poisson arrivals of parties, rate is players per minute"""
+    trace = []
+    mean_party_size = sum(size * weight for size, weight in party_sizes_weights.items()) / \
+        sum(party_sizes_weights.values())
+    t = 0
+    i = 0
+    while True:
+        t += random.expovariate(rate / 60 / mean_party_size)
+        if t > duration:
+            return trace
+        trace.append({
+            "time": round(t, 2),
+            "player_id": f"p{i}",
+            "faction": random.choices(list(faction_weights), weights=list(faction_weights.values()))[0],
+            "party_size": random.choices(list(party_sizes_weights), weights=list(party_sizes_weights.values()))[0],
+            "region": random.choice(regions),
+            "desired_match_group": "PoolAlpha",
+            "rating": round(random.gauss(25, 5), 1)
+        })
+        i += 1
+
+
+def load_trace(path):
+    with open(path) as f:
+        trace = [json.loads(line) for line in f if line.strip()]
+    for i, arrival in enumerate(trace):
+        arrival.setdefault("player_id", f"p{i}")
+    return sorted(trace, key=lambda arrival: arrival["time"])
+
+
+def try_create_match(pool_name, player_data_map, now, matchmaking_config, instant_creation):
+    """Same inputs as try_create_match of backend gets from Redis"""
+    entered_times = [player_info["entered_time"] for player_info in player_data_map.values()]
+    oldest_player_queue_time = now - min(entered_times, default=now)
+    newest_player_queue_time = now - max(entered_times, default=now)
+
+    if pool_name == "pvp_casual":
+        return try_create_pvp_match_casual(player_data_map, oldest_player_queue_time, newest_player_queue_time,
+                                           matchmaking_config["pools"]["pvp"], instant_creation=instant_creation)
+    elif pool_name == "pvp_duels":
+        return try_create_pvp_match_duel(player_data_map, oldest_player_queue_time, newest_player_queue_time,
+                                         matchmaking_config["pools"]["pvp"])
+    elif pool_name == "pve":
+        return try_create_pve_match(player_data_map, oldest_player_queue_time, matchmaking_config["pools"]["pve"],
+                                    instant_creation=instant_creation)
+    raise NotImplementedError
+
+
+def simulate(trace, pool_name, matchmaking_config, tick_interval, patience=None, instant_creation=False):
+    queue = {}  # Leader id to player info, as stored in Redis
+    results = {"waits": [], "abandoned": 0, "matches": []}
+    next_arrival = 0
+    end_time = (trace[-1]["time"] if trace else 0) + (patience or 600)
+
+    now = 0
+    while now <= end_time and (next_arrival < len(trace) or queue):
+        while next_arrival < len(trace) and trace[next_arrival]["time"] <= now:
+            arrival = trace[next_arrival]
+            player_id = arrival["player_id"]
+            party_size = arrival.get("party_size", 1)
+            queue[player_id] = {
+                "desired_match_group": arrival.get("desired_match_group"),
+                "faction": arrival["faction"],
+                "party_members": [player_id] + [f"{player_id}:{i}" for i in range(1, party_size)],
+                "region_group": get_region_group(arrival.get("region", "de")),
+                "entered_time": arrival["time"]
+            }
+            if "rating" in arrival:
+                queue[player_id]["rating"] = arrival["rating"]
+            next_arrival += 1
+
+        if patience is not None:
+            for player_id in [p for p, info in queue.items() if now - info["entered_time"] > patience]:
+                results["abandoned"] += len(queue.pop(player_id)["party_members"])
+
+        outcome = try_create_match(pool_name, queue, now, matchmaking_config, instant_creation)
+        if outcome:
+            players_in_match, match_data = outcome
+            faction_counts = match_data.get("faction_counts", {match_data["faction_setup"]: len(players_in_match)})
+            teams_ratings = {}
+            for player_id in players_in_match:
+                if player_id in queue:
+                    player_info = queue.pop(player_id)
+                    party_size = len(player_info["party_members"])
+                    results["waits"] += [now - player_info["entered_time"]] * party_size
+                    if "rating" in player_info:
+                        teams_ratings.setdefault(player_info["faction"], []).extend(
+                            [player_info["rating"]] * party_size)
+            team_average_ratings = [statistics.mean(ratings) for ratings in teams_ratings.values()]
+            results["matches"].append({
+                "time": now,
+                "match_type": match_data["match_type"],
+                "faction_counts": faction_counts,
+                "rating_diff": abs(team_average_ratings[0] - team_average_ratings[1])
+                if len(team_average_ratings) == 2 else None
+            })
+        # Like backend, at most one match per pool is created per tick
+        now += tick_interval
+
+    results["unmatched"] = sum(len(info["party_members"]) for info in queue.values())
+    return results
+
+
+def print_report(trace, results):
+    players = sum(arrival.get("party_size", 1) for arrival in trace)
+    waits = results["waits"]
+    matches = results["matches"]
+    print(f"Players: {players}, matched: {len(waits)}, abandoned: {results['abandoned']}, "
+          f"unmatched at the end: {results['unmatched']}")
+    if waits:
+        print(f"Wait time: p50 {percentile(waits, 50):.0f} s, p90 {percentile(waits, 90):.0f} s, "
+              f"p99 {percentile(waits, 99):.0f} s, max {max(waits):.0f} s, mean {statistics.mean(waits):.1f} s")
+    print(f"Matches: {len(matches)}")
+
+    match_types = {}
+    for match in matches:
+        match_types.setdefault(match["match_type"], []).append(match)
+    for match_type, type_matches in sorted(match_types.items()):
+        sizes = [sum(match["faction_counts"].values()) for match in type_matches]
+        imbalances = [max(match["faction_counts"].values()) - min(match["faction_counts"].values())
+                      for match in type_matches if len(match["faction_counts"]) == 2]
+        print(f"  {match_type}: {len(type_matches)} matches, players p50 {percentile(sizes, 50)}, "
+              f"min {min(sizes)}, max {max(sizes)}", end="")
+        if imbalances:
+            print(f", faction imbalance mean {statistics.mean(imbalances):.2f}, max {max(imbalances)}", end="")
+        rating_diffs = [match["rating_diff"] for match in type_matches if match["rating_diff"] is not None]
+        if rating_diffs:
+            print(f", team rating diff mean {statistics.mean(rating_diffs):.2f}", end="")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pool", type=str, default="pvp_casual", choices=["pvp_casual", "pvp_duels", "pve"])
+    parser.add_argument("--trace", type=str, help="JSON lines file with arrivals, synthetic trace if not set")
+    parser.add_argument("--save_trace", type=str, help="Save synthetic trace to replay it later")
+    parser.add_argument("--rate", type=float, default=10, help="Players per minute in synthetic trace")
+    parser.add_argument("--duration", type=float, default=3600, help="Seconds of synthetic trace")
+    parser.add_argument("--party_sizes", type=float, nargs=4, default=[0.7, 0.15, 0.1, 0.05],
+                        help="Weights of party sizes 1-4 in synthetic trace")
+    parser.add_argument("--faction_share", type=float, default=0.5,
+                        help="Share of first faction in synthetic trace")
+    parser.add_argument("--regions", type=str, nargs="+", default=["de", "ru", "us"])
+    parser.add_argument("--patience", type=float, help="Seconds after which player leaves the queue")
+    parser.add_argument("--tick_interval", type=float, default=TICK_INTERVAL)
+    parser.add_argument("--instant_creation", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    with open(MATCHMAKING_CONFIG_PATH) as f:
+        config = json.load(f)
+
+    if args.trace:
+        arrivals = load_trace(args.trace)
+    else:
+        arrivals = generate_trace(args.rate, args.duration,
+                                  {size + 1: weight for size, weight in enumerate(args.party_sizes)},
+                                  {GAME_FACTIONS[0]: args.faction_share, GAME_FACTIONS[1]: 1 - args.faction_share},
+                                  args.regions)
+        if args.save_trace:
+            with open(args.save_trace, "w") as f:
+                f.writelines(json.dumps(arrival) + "\n" for arrival in arrivals)
+
+    print_report(arrivals, simulate(arrivals, args.pool, config, args.tick_interval, patience=args.patience,
+                                   instant_creation=args.instant_creation))
@@ -1,5 +1,4 @@
 import datetime
-import json
 import os
 import time
 import traceback
@@ -10,6 +9,7 @@ import itertools
 from marshmallow import ValidationError
 
 from tools.s3_path_builder import S3PathBuilder
+from tools.game_data import get_game_data
 
 # Campaign status variables
 CURRENT_CAMPAIGN_NAME = os.getenv("CURRENT_CAMPAIGN_NAME", "TestCampaign")
@@ -140,9 +140,9 @@ class ResourceProcessor:
         self.s3 = s3
         self.yc = yc
 
-        campaigns_filepath = os.path.join(os.path.dirname(__file__), f"data/campaigns/campaigns.json")
-        with open(campaigns_filepath, "r", encoding="utf-8") as f:
-            self.campaigns_data = json.load(f)
+        # Static game data, loaded once per function instance
+        self.game_data = get_game_data()
+        self.campaigns_data = self.game_data.campaigns
 
     @property
     def action_not_allowed_response(self) -> typing.Tuple[dict, int]:
@@ -6,6 +6,7 @@ import io
 import zipfile
 
 from scripts.yandex_cloud_iam.yandex_iam import YandexIamAuth
+from tools.game_data import verify_game_data_bundle
 
 
 class VirtualZip:
@@ -28,6 +29,9 @@ class VirtualZip:
 
 
 def get_new_version_content():
+    # Function checks only sizes of game data files at cold start, so bundle built from other data isn't deployed
+    verify_game_data_bundle()
+
     myzip = VirtualZip()
 
     myzip.add_dir("./resources/")
@@ -54,6 +58,8 @@ def deploy_new_cloud_function_version(headers, version_content=None, version_to_
         "PLAYER_API_KEY",
         "TG_BOT_TOKEN",
         "TG_CHAT_ID",
+        "MATCHMAKING_URL",
+        "MATCHMAKING_API_KEY",
         "USER_ALWAYS_SERVER_OR_BACKEND"
     ]
 
@@ -27,30 +27,38 @@ class CampaignProcessor(ResourceProcessor):
     @api_view
     @permission_required(APIPermission.ANYONE)
     def API_GET(self, request_body: dict) -> typing.Tuple[dict, int]:
-        if CURRENT_CAMPAIGN_NAME and CURRENT_CAMPAIGN_NAME in self.campaigns_data:
-            # Active campaign is ongoing or ending
-            faction_res = self._get_factions_results()
-            campaign_data = self._get_campaign_data(CURRENT_CAMPAIGN_NAME)
-            end_ts = datetime.datetime.fromisoformat(campaign_data["end_time_iso"]).timestamp()
-
-            return {
-                "success": True,
-                "data": {
-                    "is_active": True,
-                    "campaign": CURRENT_CAMPAIGN_NAME,
-                    "end_ts": end_ts,
-                    "scores": faction_res,
-                    **campaign_data
-                }
-            }, 200
+        if self.has_active_campaign():
+            return self.get_active_campaign_response(self._get_factions_results())
         else:
-            # No active campaign
-            return {
-                "success": True,
-                "data": {
-                    "is_active": False,
-                }
-            }, 200
+            return self.no_active_campaign_response
+
+    def has_active_campaign(self) -> bool:
+        """Checks if campaign is ongoing or ending"""
+        return bool(CURRENT_CAMPAIGN_NAME and CURRENT_CAMPAIGN_NAME in self.campaigns_data)
+
+    def get_active_campaign_response(self, faction_res: dict) -> typing.Tuple[dict, int]:
+        campaign_data = self._get_campaign_data(CURRENT_CAMPAIGN_NAME)
+        end_ts = datetime.datetime.fromisoformat(campaign_data["end_time_iso"]).timestamp()
+
+        return {
+            "success": True,
+            "data": {
+                "is_active": True,
+                "campaign": CURRENT_CAMPAIGN_NAME,
+                "end_ts": end_ts,
+                "scores": faction_res,
+                **campaign_data
+            }
+        }, 200
+
+    @property
+    def no_active_campaign_response(self) -> typing.Tuple[dict, int]:
+        return {
+            "success": True,
+            "data": {
+                "is_active": False,
+            }
+        }, 200
 
     def _get_campaign_data(self, campaign) -> dict:
         """Retrieves campaign data from JSON file"""
@@ -76,8 +84,13 @@ class CampaignProcessor(ResourceProcessor):
         if code != 0 or len(result) == 0:
             raise Exception("Couldn't retrieve campaign results")
 
+        return self.get_factions_results_from_rows(result[0].rows)
+
+    def get_factions_results_from_rows(self, rows) -> dict[str, int]:
+        """Calculates faction scores from campaign results table rows"""
+
         dump_schema = FactionCampaignResultSchema()
-        records = [dump_schema.dump(r) for r in result[0].rows]
+        records = [dump_schema.dump(r) for r in rows]
 
         play_amounts = {r["faction"]: r["played_matches"] for r in records}
         win_amounts = {r["faction"]: r["won_matches"] for r in records}
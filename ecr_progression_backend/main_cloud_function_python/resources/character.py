@@ -320,10 +320,7 @@ class CharacterProcessor(ResourceProcessor):
         history_rel_path = f"{ts.year}-{ts.month:02d}-{ts.day:02d}.csv"
         history_path = self.s3_paths.get_character_currency_history_s3_path(player, char, history_rel_path)
 
-        if self.s3.check_exists(history_path):
-            content = self.s3.get_file_from_s3(history_path)
-        else:
-            content = b""
+        content = self.s3.get_file_from_s3_or_default(history_path, b"")
 
         content += f"{old_free_xp},{free_xp_delta}," \
                    f"{old_silver},{silver_delta}," \
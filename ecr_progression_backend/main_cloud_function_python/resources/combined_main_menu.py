@@ -1,10 +1,11 @@
 import typing
 
-from common import ResourceProcessor, permission_required, APIPermission, api_view
+from common import ResourceProcessor, permission_required, APIPermission, api_view, CURRENT_CAMPAIGN_NAME
 from resources.campaign import CampaignProcessor
-from resources.character import CharacterProcessor
-from resources.player import PlayerProcessor
+from resources.character import CharacterProcessor, CharacterSchema
+from resources.player import PlayerProcessor, PlayerSchema
 from resources.progression_store import ProgressionStoreProcessor
+from tools.concurrency import ParallelCalls
 
 
 class CombinedMainMenuProcessor(ResourceProcessor):
@@ -21,29 +22,99 @@ class CombinedMainMenuProcessor(ResourceProcessor):
     @api_view
     @permission_required(APIPermission.SERVER_OR_OWNING_PLAYER, player_arg_name="id")
     def API_GET(self, request_body: dict) -> typing.Tuple[dict, int]:
-        """Get all required data about player for main menu: basic player data, list of characters"""
-
-        r1, s1 = self.player_processor.API_GET(request_body)
-        if s1 != 200:
-            return r1, s1
+        """Get all required data about player for main menu: basic player data, list of characters, campaign status
+        and unlocked progression of characters.
+
+        Everything from YDB is read with one multi-statement query, unlocked progression of characters is read
+        from S3 concurrently"""
+
+        schema = PlayerSchema(only=("id",))
+        validated_data = schema.load(request_body)
+        player = validated_data.get("id")
+
+        query = f"""
+            DECLARE $PLAYER AS Int64;
+            DECLARE $CAMPAIGN AS Utf8;
+
+            SELECT * FROM {self.player_processor.table_name}
+            WHERE
+                id = $PLAYER
+            ;
+
+            SELECT * FROM {self.character_processor.table_name}
+            WHERE
+                player = $PLAYER
+            ;
+
+            SELECT * FROM {self.campaign_processor.table_name}
+            WHERE
+                campaign = $CAMPAIGN
+            ;
+
+            SELECT * FROM {self.progression_processor.ach_table_name}
+            WHERE
+                char IN (SELECT id FROM {self.character_processor.table_name} WHERE player = $PLAYER)
+            ;
+
+            SELECT * FROM {self.progression_processor.campaign_char_results_table_name}
+            WHERE
+                char IN (SELECT id FROM {self.character_processor.table_name} WHERE player = $PLAYER) AND
+                campaign = $CAMPAIGN
+            ;
+        """
+
+        query_params = {
+            '$PLAYER': player,
+            '$CAMPAIGN': CURRENT_CAMPAIGN_NAME,
+        }
+
+        result, code = self.yc.process_query(query, query_params)
+        if code != 0 or len(result) != 5:
+            return self.internal_server_error_response
+        player_rows, char_rows, campaign_rows, achievement_rows, campaign_char_rows = [r.rows for r in result]
+
+        if len(player_rows) == 0:
+            # User not found by internal id
+            return {"success": False}, 404
+        player_data = PlayerSchema().dump(player_rows[0])
+
+        dump_schema = CharacterSchema()
+        chars_data = [dump_schema.dump(r) for r in char_rows]
+
+        if self.campaign_processor.has_active_campaign():
+            r3, s3 = self.campaign_processor.get_active_campaign_response(
+                self.campaign_processor.get_factions_results_from_rows(campaign_rows))
+        else:
+            r3, s3 = self.campaign_processor.no_active_campaign_response
 
-        r2, s2 = self.character_processor.API_LIST({"player": request_body.get("id")})
-        if s2 != 200:
-            return r2, s2
+        # Unlocked progression files of all characters at once
+        with ParallelCalls() as calls:
+            unlocked_progression_futures = calls.map(
+                lambda char_piece: self.progression_processor.get_unlocked_progression(player, char_piece["id"]),
+                chars_data
+            )
+        unlocked_progressions = [future.result() for future in unlocked_progression_futures]
 
-        r3, s3 = self.campaign_processor.API_GET({})
-        if s3 != 200:
-            return r3, s3
+        char_to_achievement_rows = {}
+        for row in achievement_rows:
+            char_to_achievement_rows.setdefault(row["char"], []).append(row)
+        char_to_campaign_progress = {row["char"]: row["won_matches"] for row in campaign_char_rows}
 
         char_to_progression = {}
-        for char_piece in r2["data"]:
-            r4, s4 = self.progression_processor.API_GET({"player": request_body.get("id"), "char": char_piece["id"]})
-            if s4 != 200:
-                return r4, s4
-            char_to_progression[char_piece["id"]] = r4["data"]
+        for char_piece, unlocked_progression in zip(chars_data, unlocked_progressions):
+            if unlocked_progression is None:
+                return self.progression_processor.malformed_progression_response
+
+            char = char_piece["id"]
+            char_to_progression[char] = {
+                **unlocked_progression,
+                "campaign_progress": char_to_campaign_progress.get(char, 0) if CURRENT_CAMPAIGN_NAME else -1,
+                "quest_status": self.progression_processor.get_quest_status_from_rows(
+                    char_to_achievement_rows.get(char, []))
+            }
 
         return {"success": True,
-                "data": {"player": r1.get("data"), "characters": r2.get("data"), "campaign": r3.get("data"),
+                "data": {"player": player_data, "characters": chars_data, "campaign": r3.get("data"),
                          "progression": char_to_progression}}, 200
 
     @api_view
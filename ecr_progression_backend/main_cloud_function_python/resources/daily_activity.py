@@ -3,8 +3,6 @@ import random
 import traceback
 import typing
 import datetime
-import json
-import os
 
 from common import ResourceProcessor, permission_required, APIPermission, batch_iterator, api_view
 from tools.common_schemas import ExcludeSchema, CharPlayerSchema
@@ -37,9 +35,7 @@ class DailyActivityProcessor(ResourceProcessor):
 
         self.table_name = self.get_table_name_for_contour("ecr_dailies")
 
-        dailies_filepath = os.path.join(os.path.dirname(__file__), f"../data/dailies/dailies.json")
-        with open(dailies_filepath, "r") as f:
-            self.dailies_data = json.load(f)
+        self.dailies_data = self.game_data.dailies
 
     @api_view
     @permission_required(APIPermission.ANYONE)
@@ -3,7 +3,6 @@ import os
 import traceback
 import typing
 import uuid
-import json
 import requests
 
 from marshmallow import fields, validate, ValidationError
@@ -13,6 +12,9 @@ from common import ResourceProcessor, CURRENT_CAMPAIGN_NAME, batch_iterator, per
 from resources.daily_activity import DailyActivityProcessor, DailyActivitySchema
 from tools.common_schemas import ExcludeSchema, ECR_FACTIONS
 from tools.challenge import verify_challenge
+from tools.matchmaking_connection import push_player_ratings
+from tools.concurrency import submit_background
+from tools.rating import MU, SIGMA, rate_match
 from tools.tg_connection import send_telegram_message
 
 # Constants for checking rewards granting abuse (due to P2P nature of the game)
@@ -77,20 +79,10 @@ class MatchResultsProcessor(ResourceProcessor):
         self.campaign_table_name = self.get_table_name_for_contour("ecr_campaign_results")
         self.campaign_chars_table_name = self.get_table_name_for_contour("ecr_campaign_results_chars")
         self.dailies_table_name = self.get_table_name_for_contour("ecr_dailies")
+        self.ratings_table_name = self.get_table_name_for_contour("ecr_player_ratings")
 
-        # Remember all achievements names
-        self.all_achievements_names = []
-        for faction in ECR_FACTIONS:
-            filepath = f"../data/quests/quests_{faction.lower()}.json"
-            final_filepath = os.path.join(os.path.dirname(__file__), filepath)
-            with open(final_filepath) as f:
-                achievements_data = json.load(f)
-                self.all_achievements_names += list(achievements_data.keys())
-
-        # Remember all missions data
-        missions_filepath = os.path.join(os.path.dirname(__file__), f"../data/missions/missions.json")
-        with open(missions_filepath, "r") as f:
-            self.missions_data = json.load(f)
+        self.all_achievements_names = self.game_data.all_quest_names
+        self.missions_data = self.game_data.missions
 
     @api_view
     @permission_required(APIPermission.ANYONE)
@@ -168,7 +160,7 @@ class MatchResultsProcessor(ResourceProcessor):
             return {"success": False, "error": "Granting results not possible"}, 404
 
         # 2. Process match results into batch DB operations
-        tx_queries_and_params, max_xp = self._process_match_results(match_results, match_creation_data)
+        tx_queries_and_params, max_xp, new_ratings = self._process_match_results(match_results, match_creation_data)
 
         # 3. Apply transaction
         result, code = self.yc.process_queries_in_atomic_transaction(tx_queries_and_params)
@@ -176,7 +168,12 @@ class MatchResultsProcessor(ResourceProcessor):
             self.logger.error("Couldn't grant rewards because atomic transaction failed")
             return self.internal_server_error_response
 
-        # 4. Soft check for suspicious grants
+        # 4. Share new ratings with matchmaking, so it doesn't have to ask DB for each player. Not waited for,
+        # so slow matchmaking doesn't delay results, ratings are in DB anyway
+        if new_ratings:
+            submit_background(push_player_ratings, new_ratings)
+
+        # 5. Soft check for suspicious grants
         now_ts = int(datetime.datetime.now(tz=datetime.timezone.utc).timestamp())
         self.__perform_aggregated_currency_grant_soft_check(
             match_id, now_ts
@@ -290,9 +287,15 @@ class MatchResultsProcessor(ResourceProcessor):
                                                                                    res["is_winner"])
         tx_queries += self.__get_queries_to_notify_chars_match_won(char_winners_req, match_creation_data["mission"])
 
+        # Ratings are changed only for PvP matches with a winner, as only then teams are known
+        new_ratings = {}
+        if len(faction_results) == 2 and not no_winners_in_match:
+            new_ratings = self.__get_new_ratings(char_results, match_creation_data["mission"])
+            tx_queries += self.__get_queries_for_batch_update_ratings(new_ratings)
+
         tx_queries += self.__get_queries_for_mark_match_finished(char_results, match_results["match_id"].hex, max_xp)
 
-        return tx_queries, max_xp
+        return tx_queries, max_xp, new_ratings
 
     def _process_char_result(
             self,
@@ -433,6 +436,83 @@ class MatchResultsProcessor(ResourceProcessor):
         logger.error("Couldn't retrieve data about daily activity")
         return None
 
+    def __get_players_ratings(self, players: typing.Iterable) -> typing.Union[dict, None]:
+        """Retrieves from DB ratings (mu, sigma) for the specified players, default rating for players without one"""
+
+        query = f"""
+            DECLARE $batch AS List<Struct<id:Int64>>;
+
+            SELECT b.id AS id, t.mu AS mu, t.sigma AS sigma
+            FROM AS_TABLE($batch) AS b
+            LEFT JOIN {self.ratings_table_name} AS t
+              ON t.id = b.id;
+        """
+
+        query_params = {"$batch": [{"id": player} for player in players]}
+
+        result, code = self.yc.process_query(query, query_params)
+        if code == 0 and len(result) > 0:
+            ratings = {}
+            for row in result[0].rows:
+                if row["mu"] is None or row["sigma"] is None:
+                    ratings[row["id"]] = (MU, SIGMA)
+                else:
+                    ratings[row["id"]] = (row["mu"], row["sigma"])
+            return ratings
+
+        self.logger.error("Couldn't retrieve ratings of players")
+        return None
+
+    def __get_new_ratings(self, char_results: dict, mission: str) -> dict:
+        """Calculates new ratings of players after PvP match, only for dedicated servers"""
+
+        if not self.is_mission_pvp(mission) or not self.is_user_server_or_backend(allow_emulation=True):
+            return {}
+
+        # Player is rated once per match, by the first character result
+        players_won = {}
+        for char_result in char_results.values():
+            players_won.setdefault(char_result["player"], char_result["is_winner"])
+
+        if all(players_won.values()) or not any(players_won.values()):
+            return {}
+
+        old_ratings = self.__get_players_ratings(players_won.keys())
+        if old_ratings is None:
+            raise Exception("Couldn't fetch old ratings for players, aborting")
+
+        winners = {player: old_ratings[player] for player, won in players_won.items() if won}
+        losers = {player: old_ratings[player] for player, won in players_won.items() if not won}
+        return rate_match(winners, losers)
+
+    def __get_queries_for_batch_update_ratings(self, players_to_ratings: dict) -> list:
+        """Constructs queries for batch setting ratings of players"""
+
+        queries_and_params = []
+        for chunk in batch_iterator(players_to_ratings.items(), 100):
+            batch = [
+                {"id": player_id, "mu": mu, "sigma": sigma}
+                for player_id, (mu, sigma) in chunk
+            ]
+
+            query = f"""
+                DECLARE $batch AS List<Struct<id: Int64, mu: Double, sigma: Double>>;
+
+                UPSERT INTO {self.ratings_table_name} (id, mu, sigma, matches)
+                SELECT
+                    b.id,
+                    b.mu,
+                    b.sigma,
+                    COALESCE(t.matches, 0) + 1 AS matches
+                FROM AS_TABLE($batch) AS b
+                LEFT JOIN {self.ratings_table_name} AS t
+                ON b.id = t.id;
+            """
+
+            query_params = {"$batch": batch}
+            queries_and_params.append((query, query_params))
+        return queries_and_params
+
     def __get_queries_for_mark_match_finished(self, char_results, match_id, max_xp):
         """Constructs query for updating match data in DB, eg set match as completed"""
 
@@ -1,9 +1,8 @@
+import bisect
 import logging
 import traceback
 import typing
 import datetime
-import json
-import os
 
 from common import ResourceProcessor, permission_required, APIPermission, batch_iterator, api_view
 from tools.common_schemas import ExcludeSchema
@@ -40,8 +39,7 @@ class PlayerProcessor(ResourceProcessor):
 
         self.table_name = self.get_table_name_for_contour("ecr_players")
 
-        with open(os.path.join(os.path.dirname(__file__), "../data/levels.json")) as f:
-            self.levelling_data = json.load(f)
+        self.levelling_data = self.game_data.levels
 
     @api_view
     @permission_required(APIPermission.ANYONE)
@@ -125,10 +123,7 @@ class PlayerProcessor(ResourceProcessor):
         history_rel_path = f"{ts.year}-{ts.month:02d}-{ts.day:02d}.csv"
         history_path = self.s3_paths.get_player_currency_history_s3_path(player_id, history_rel_path)
 
-        if self.s3.check_exists(history_path):
-            content = self.s3.get_file_from_s3(history_path)
-        else:
-            content = b""
+        content = self.s3.get_file_from_s3_or_default(history_path, b"")
 
         content += f"{old_xp},{xp_delta}," \
                    f"{source.replace(',', '')},{source_additional_data.replace(',', '')}," \
@@ -136,13 +131,11 @@ class PlayerProcessor(ResourceProcessor):
         self.s3.upload_file_to_s3(content, history_path)
 
     def get_level_from_xp(self, xp):
-        level = 1
-        for row in self.levelling_data:
-            if xp >= row["xp_amount"]:
-                level = row["level"]
-            else:
-                break
-        return level
+        # Levels are ordered by XP amount
+        reached_levels_amount = bisect.bisect_right(self.game_data.level_xp_amounts, xp)
+        if reached_levels_amount == 0:
+            return 1
+        return self.levelling_data[reached_levels_amount - 1]["level"]
 
 
 if __name__ == '__main__':
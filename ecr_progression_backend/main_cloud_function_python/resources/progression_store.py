@@ -2,7 +2,6 @@ import datetime
 import json
 import random
 import typing
-import os
 
 from common import ResourceProcessor, permission_required, APIPermission, api_view, CURRENT_CAMPAIGN_NAME
 from marshmallow import Schema, fields, validate, ValidationError
@@ -10,6 +9,7 @@ from marshmallow import Schema, fields, validate, ValidationError
 from resources.player import PlayerProcessor
 from resources.character import CharacterProcessor
 from tools.common_schemas import CharPlayerSchema, ExcludeSchema
+from tools.concurrency import ParallelCalls
 
 
 class ProgressionItemType:
@@ -85,55 +85,60 @@ class ProgressionStoreProcessor(ResourceProcessor):
 
         player = validated_data.get("player")
         char = validated_data.get("char")
-        progression_path = self.s3_paths.get_unlocked_progression_s3_path(player, char)
 
-        achievements = {}
-        if include_achievements:
-            query = f"""
-                DECLARE $CHAR AS Int64;
+        # Achievements, campaign progress and unlocked progression are independent, so they are requested at once
+        with ParallelCalls() as calls:
+            achievements_future = None
+            if include_achievements:
+                query = f"""
+                    DECLARE $CHAR AS Int64;
+
+                    SELECT * FROM {self.ach_table_name}
+                    WHERE
+                        char = $CHAR
+                    ;
+                """
+
+                query_params = {
+                    '$CHAR': validated_data.get("char"),
+                }
 
-                SELECT * FROM {self.ach_table_name}
-                WHERE
-                    char = $CHAR
-                ;
-            """
+                achievements_future = calls.submit(self.yc.process_query, query, query_params)
 
-            query_params = {
-                '$CHAR': validated_data.get("char"),
-            }
+            campaign_progress_future = None
+            if include_campaign_progress and CURRENT_CAMPAIGN_NAME:
+                query = f"""
+                    DECLARE $CHAR AS Int64;
+                    DECLARE $CAMPAIGN AS Utf8;
 
-            result, code = self.yc.process_query(query, query_params)
+                    SELECT * FROM {self.campaign_char_results_table_name}
+                    WHERE
+                        char = $CHAR AND
+                        campaign = $CAMPAIGN
+                    LIMIT 1;
+                """
+
+                query_params = {
+                    '$CHAR': validated_data.get("char"),
+                    '$CAMPAIGN': CURRENT_CAMPAIGN_NAME,
+                }
+
+                campaign_progress_future = calls.submit(self.yc.process_query, query, query_params)
+
+            unlocked_progression_future = calls.submit(self.get_unlocked_progression, player, char)
+
+        achievements = {}
+        if achievements_future is not None:
+            result, code = achievements_future.result()
             if code == 0:
                 if len(result) > 0:
-                    dump_schema = AchievementSchema()
-                    achievements_raw = [dump_schema.dump(r) for r in result[0].rows]
-                    for achievement in achievements_raw:
-                        achievements[achievement["name"]] = {
-                            "progress": achievement["progress"],
-                            "reward_claimed_time": achievement["reward_claimed_time"]
-                        }
+                    achievements = self.get_quest_status_from_rows(result[0].rows)
             else:
                 return self.internal_server_error_response
 
         campaign_progress = -1
-        if include_campaign_progress and CURRENT_CAMPAIGN_NAME:
-            query = f"""
-                DECLARE $CHAR AS Int64;
-                DECLARE $CAMPAIGN AS Utf8;
-
-                SELECT * FROM {self.campaign_char_results_table_name}
-                WHERE
-                    char = $CHAR AND
-                    campaign = $CAMPAIGN
-                LIMIT 1;
-            """
-
-            query_params = {
-                '$CHAR': validated_data.get("char"),
-                '$CAMPAIGN': CURRENT_CAMPAIGN_NAME,
-            }
-
-            result, code = self.yc.process_query(query, query_params)
+        if campaign_progress_future is not None:
+            result, code = campaign_progress_future.result()
             if code != 0 or len(result) == 0:
                 raise Exception("Failed to get campaign progress")
 
@@ -142,37 +147,57 @@ class ProgressionStoreProcessor(ResourceProcessor):
             else:
                 campaign_progress = result[0].rows[0]["won_matches"]
 
-        # Check if file with unlocked cosmetics data exists
-        if self.s3.check_exists(progression_path):
-            content = self.s3.get_file_from_s3(progression_path)
+        data = unlocked_progression_future.result()
+        if data is None:
+            return self.malformed_progression_response
+
+        return {
+            "success": True,
+            "data": {
+                **data,
+                "campaign_progress": campaign_progress,
+                "quest_status": achievements
+            }
+        }, 200
+
+    @property
+    def malformed_progression_response(self) -> typing.Tuple[dict, int]:
+        return {"success": False, "error_code": 2, "error": "Unlocked progression data malformed"}, 500
+
+    def get_unlocked_progression(self, player, char) -> typing.Union[dict, None]:
+        """Reads unlocked progression of character from S3 (empty if character has none yet), None if it's malformed"""
+
+        progression_path = self.s3_paths.get_unlocked_progression_s3_path(player, char)
+
+        content = self.s3.get_file_from_s3_or_default(progression_path)
+        if content is not None:
             data = json.loads(content)
 
             json_schema = UnlockedProgressionContentSchema()
             try:
-                data = json_schema.load(data)
+                return json_schema.load(data)
             except ValidationError:
-                return {"success": False, "error_code": 2, "error": "Unlocked progression data malformed"}, 500
-
-            return {
-                "success": True,
-                "data": {
-                    **data,
-                    "campaign_progress": campaign_progress,
-                    "quest_status": achievements
-                }
-            }, 200
+                return None
         else:
             return {
-                "success": True,
-                "data": {
-                    "unlocked_gameplay_items": [],
-                    "unlocked_cosmetic_items": [],
-                    "unlocked_advancements": [],
-                    "unlocked_titles": [],
-                    "campaign_progress": campaign_progress,
-                    "quest_status": achievements
-                }
-            }, 200
+                "unlocked_gameplay_items": [],
+                "unlocked_cosmetic_items": [],
+                "unlocked_advancements": [],
+                "unlocked_titles": [],
+            }
+
+    @staticmethod
+    def get_quest_status_from_rows(rows) -> dict:
+        """Quest progress of character by quest name from achievements table rows"""
+
+        quest_status = {}
+        dump_schema = AchievementSchema()
+        for achievement in (dump_schema.dump(r) for r in rows):
+            quest_status[achievement["name"]] = {
+                "progress": achievement["progress"],
+                "reward_claimed_time": achievement["reward_claimed_time"]
+            }
+        return quest_status
 
     @permission_required(APIPermission.OWNING_PLAYER_ONLY)
     def API_BUY(self, request_body: dict) -> typing.Tuple[dict, int]:
@@ -526,18 +551,14 @@ class ProgressionStoreProcessor(ResourceProcessor):
             return current_progress >= quest_data["max_value"]
 
     def _get_quest_data(self, quest_name: str, faction: str) -> typing.Tuple[bool, dict]:
-        filepath = f"../data/quests/quests_{faction.lower()}.json"
-
-        final_filepath = os.path.join(os.path.dirname(__file__), filepath)
-        if os.path.exists(final_filepath):
-            with open(final_filepath) as f:
-                quest_data = json.load(f)
-                if quest_name in quest_data:
-                    return True, quest_data[quest_name]
-                else:
-                    return False, {}
+        faction_data = self.game_data.get_faction_data(faction)
+        if faction_data is None:
+            self.logger.warning(f"No quest data for faction {faction}")
+            return False, {}
+
+        if quest_name in faction_data.quests:
+            return True, faction_data.quests[quest_name]
         else:
-            self.logger.warning(f"Quest filepath {filepath} doesn't exist")
             return False, {}
 
     def _get_random_item_from_lootbox(self, faction: str, player_unlocked_gameplay_items: list,
@@ -551,40 +572,41 @@ class ProgressionStoreProcessor(ResourceProcessor):
 
         lootbox_type = lootbox_data["type"]
 
+        faction_data = self.game_data.get_faction_data(faction)
+        if faction_data is None:
+            self.logger.warning(f"No items data for faction {faction}")
+            return None
+
         if lootbox_type == LootboxType.SUPPLY_CRATE:
-            filepath = f"../data/gameplay_items/gameplay_items_{faction.lower()}.json"
-            unlocked_items = player_unlocked_gameplay_items
+            lootbox_items = faction_data.lootbox_gameplay_items
+            unlocked_items = set(player_unlocked_gameplay_items)
             required_subfaction = None
         elif lootbox_type == LootboxType.COSMETIC_BUNDLE_ONE_ITEM:
-            filepath = f"../data/cosmetic_items/cosmetic_items_{faction.lower()}.json"
-            unlocked_items = player_unlocked_cosmetic_items
+            lootbox_items = faction_data.lootbox_cosmetic_items
+            unlocked_items = set(player_unlocked_cosmetic_items)
             required_subfaction = lootbox_data.get("required_subfaction", None)
         else:
             raise NotImplementedError(f"Not implemented lootbox type {lootbox_type}")
 
-        final_filepath = os.path.join(os.path.dirname(__file__), filepath)
-        if os.path.exists(final_filepath):
-            with open(final_filepath) as f:
-                item_data = json.load(f)
-                for item, item_piece in item_data.items():
-                    item = item.lower()
-                    if item_piece["is_lootbox_granted"] and item not in unlocked_items and item_piece["is_enabled"]:
-                        if lootbox_main_rarity:
-                            if item_piece["rarity"] == lootbox_main_rarity:
-                                lootbox_available = True
-                            elif item_piece["rarity"] not in lootbox_rarity_chances:
-                                continue
-
-                        if required_subfaction:
-                            if item_piece.get("subfaction", None) == required_subfaction:
-                                lootbox_available = True
-                            else:
-                                continue
-
-                        rarity_to_items.setdefault(item_piece["rarity"], []).append(item)
-        else:
-            self.logger.warning(f"Items filepath {filepath} doesn't exist")
-            return None
+        # Only enabled lootbox granted items are here, grouped by rarity
+        for rarity, rarity_items in lootbox_items.items():
+            if lootbox_main_rarity and rarity != lootbox_main_rarity and rarity not in lootbox_rarity_chances:
+                continue
+
+            for item, item_piece in rarity_items:
+                if item in unlocked_items:
+                    continue
+
+                if lootbox_main_rarity and rarity == lootbox_main_rarity:
+                    lootbox_available = True
+
+                if required_subfaction:
+                    if item_piece.get("subfaction", None) == required_subfaction:
+                        lootbox_available = True
+                    else:
+                        continue
+
+                rarity_to_items.setdefault(rarity, []).append(item)
 
         if lootbox_available:
             if lootbox_type == LootboxType.SUPPLY_CRATE:
@@ -611,18 +633,14 @@ class ProgressionStoreProcessor(ResourceProcessor):
             return None
 
     def _get_lootbox_data(self, lootbox_name: str, faction: str) -> typing.Tuple[bool, dict]:
-        filepath = f"../data/lootboxes/lootboxes_{faction.lower()}.json"
-
-        final_filepath = os.path.join(os.path.dirname(__file__), filepath)
-        if os.path.exists(final_filepath):
-            with open(final_filepath) as f:
-                lootbox_data = json.load(f)
-                if lootbox_name in lootbox_data:
-                    return True, lootbox_data[lootbox_name]
-                else:
-                    return False, {}
+        faction_data = self.game_data.get_faction_data(faction)
+        if faction_data is None:
+            self.logger.warning(f"No lootbox data for faction {faction}")
+            return False, {}
+
+        if lootbox_name in faction_data.lootboxes:
+            return True, faction_data.lootboxes[lootbox_name]
         else:
-            self.logger.warning(f"Lootbox filepath {filepath} doesn't exist")
             return False, {}
 
     def _external_unlock(self, player, char, gameplay_items_to_unlock, cosmetics_to_unlock,
@@ -677,46 +695,32 @@ class ProgressionStoreProcessor(ResourceProcessor):
             return {"error": f"No character {char}", "error_code": 1}, 404
 
         faction = char_data["faction"]
+        faction_data = self.game_data.get_faction_data(faction)
+        if faction_data is None:
+            return {"error": f"No progression data for faction {faction}", "error_code": 2}, 404
 
-        with open(f"../data/gameplay_items/gameplay_items_{faction.lower()}.json", "r", encoding="utf-8") as f:
-            gameplay_items_data = json.load(f)
-            gameplay_items = [el for el, data in gameplay_items_data.items()]
-
-        with open(f"../data/cosmetic_items/cosmetic_items_{faction.lower()}.json", "r", encoding="utf-8") as f:
-            cosmetic_items_data = json.load(f)
-            cosmetic_items = [el for el, data in cosmetic_items_data.items()]
-
-        with open(f"../data/advancements/advancements_{faction.lower()}.json", "r", encoding="utf-8") as f:
-            advancements_data = json.load(f)
-            advancements = [el for el, data in advancements_data.items()]
-
-        with open(f"../data/quests/quests_{faction.lower()}.json", "r", encoding="utf-8") as f:
-            quests_data = json.load(f)
-            titles = [data["reward_title"] for el, data in quests_data.items() if data["reward_title"]]
-
-        r, s = self._external_unlock(player, char, gameplay_items, cosmetic_items, advancements, titles)
+        r, s = self._external_unlock(player, char, list(faction_data.gameplay_items), list(faction_data.cosmetic_items),
+                                     list(faction_data.advancements), list(faction_data.titles))
         return r, s
 
     def _get_item_data(self, item_id: str, item_type: str, faction: str) -> typing.Tuple[bool, dict]:
+        faction_data = self.game_data.get_faction_data(faction)
+        if faction_data is None:
+            self.logger.warning(f"No progression data for faction {faction}")
+            return False, {}
+
         if item_type == ProgressionItemType.GAMEPLAY_ITEM:
-            filepath = f"../data/gameplay_items/gameplay_items_{faction.lower()}.json"
+            item_data = faction_data.gameplay_items
         elif item_type == ProgressionItemType.COSMETIC_ITEM:
-            filepath = f"../data/cosmetic_items/cosmetic_items_{faction.lower()}.json"
+            item_data = faction_data.cosmetic_items
         elif item_type == ProgressionItemType.ADVANCEMENT:
-            filepath = f"../data/advancements/advancements_{faction.lower()}.json"
+            item_data = faction_data.advancements
         else:
             raise ValueError(f"Wrong ProgressionItemType: {item_type}")
 
-        final_filepath = os.path.join(os.path.dirname(__file__), filepath)
-        if os.path.exists(final_filepath):
-            with open(final_filepath) as f:
-                item_data = json.load(f)
-                if item_id in item_data:
-                    return True, item_data[item_id]
-                else:
-                    return False, {}
+        if item_id in item_data:
+            return True, item_data[item_id]
         else:
-            self.logger.warning(f"Progression filepath {filepath} doesn't exist")
             return False, {}
 
     def _clear_all_progression(self, player, char, clear_quest_status=True):
@@ -1,6 +1,12 @@
+import os
+import sys
 import pandas as pd
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from tools.game_data import load_game_data, save_game_data_bundle
+
 faction_files = {
     "LoyalSpaceMarines": (
         "gameplay_items_lsm.csv",
@@ -201,3 +207,8 @@ for i, row in df.iterrows():
 
 with open(f"../data/missions/missions.json", "w") as f:
     json.dump(missions_data, f, indent=4, ensure_ascii=False)
+
+# Saving compact bundle of all game data with lookup tables, loaded by backend at cold start instead of JSON files
+game_data = load_game_data("../data")
+save_game_data_bundle(game_data, "../data/game_data.pickle", "../data")
+print(f"Game data bundle saved, content hash {game_data.content_hash}")
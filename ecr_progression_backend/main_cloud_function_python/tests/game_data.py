@@ -0,0 +1,125 @@
+import os
+import json
+import tempfile
+import unittest
+
+from tools.common_schemas import ECR_FACTIONS
+from tools.game_data import load_game_data, save_game_data_bundle, load_game_data_bundle, verify_game_data_bundle
+
+ITEMS = {
+    "bolter": {"is_lootbox_granted": True, "is_enabled": True, "rarity": "common"},
+    "plasmagun": {"is_lootbox_granted": True, "is_enabled": True, "rarity": "rare"},
+    "chainsword": {"is_lootbox_granted": False, "is_enabled": True, "rarity": "common"}
+}
+QUESTS = {
+    "quest1": {"reward_title": "Veteran"},
+    "quest2": {"reward_title": ""}
+}
+LEVELS = [{"xp_amount": 0, "level": 1}, {"xp_amount": 3000, "level": 2}, {"xp_amount": 8000, "level": 3}]
+
+
+class TestGameData(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp_dir.name
+        self.bundle_path = os.path.join(self.data_dir, "game_data.pickle")
+
+        for faction in ECR_FACTIONS:
+            faction_name = faction.lower()
+            self.write_json(f"gameplay_items/gameplay_items_{faction_name}.json", ITEMS)
+            self.write_json(f"cosmetic_items/cosmetic_items_{faction_name}.json", {})
+            self.write_json(f"advancements/advancements_{faction_name}.json", {})
+            self.write_json(f"quests/quests_{faction_name}.json", QUESTS)
+            self.write_json(f"lootboxes/lootboxes_{faction_name}.json", {})
+        self.write_json("campaigns/campaigns.json", {"testcampaign": {"is_active": True}})
+        self.write_json("missions/missions.json", {"minedomination": {"mode": "pvp"}})
+        self.write_json("dailies/dailies.json", {})
+        self.write_json("levels.json", LEVELS)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_json(self, relative_path, data):
+        path = os.path.join(self.data_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+
+    def test_bundle_round_trip(self):
+        game_data = load_game_data(self.data_dir)
+        save_game_data_bundle(game_data, self.bundle_path, self.data_dir)
+        bundled = load_game_data_bundle(self.bundle_path, self.data_dir)
+
+        self.assertIsNotNone(bundled)
+        verify_game_data_bundle(self.bundle_path, self.data_dir)
+        self.assertEqual(game_data.content_hash, bundled.content_hash)
+        self.assertDictEqual(dict(game_data.campaigns), dict(bundled.campaigns))
+        self.assertDictEqual(dict(game_data.missions), dict(bundled.missions))
+        self.assertTupleEqual(game_data.levels, bundled.levels)
+        self.assertTupleEqual((0, 3000, 8000), bundled.level_xp_amounts)
+        self.assertSetEqual(set(game_data.all_quest_names), set(bundled.all_quest_names))
+
+        for faction in ECR_FACTIONS:
+            faction_data = game_data.get_faction_data(faction)
+            bundled_faction_data = bundled.get_faction_data(faction)
+            self.assertDictEqual(dict(faction_data.gameplay_items), dict(bundled_faction_data.gameplay_items))
+            self.assertDictEqual(dict(faction_data.lootbox_gameplay_items),
+                                 dict(bundled_faction_data.lootbox_gameplay_items))
+            self.assertTupleEqual(("Veteran",), bundled_faction_data.titles)
+
+        # Bundled data is read-only as well
+        with self.assertRaises(TypeError):
+            bundled.campaigns["testcampaign"] = {}
+
+    def test_nested_data_read_only(self):
+        game_data = load_game_data(self.data_dir)
+        save_game_data_bundle(game_data, self.bundle_path, self.data_dir)
+        bundled = load_game_data_bundle(self.bundle_path, self.data_dir)
+
+        for data in (game_data, bundled):
+            faction_data = data.get_faction_data(ECR_FACTIONS[0])
+            with self.assertRaises(TypeError):
+                faction_data.gameplay_items["bolter"]["rarity"] = "legendary"
+            with self.assertRaises(TypeError):
+                faction_data.quests["quest1"].update(reward_title="")
+            with self.assertRaises(TypeError):
+                data.campaigns["testcampaign"].pop("is_active")
+            with self.assertRaises(TypeError):
+                data.levels[0]["xp_amount"] = 100
+            self.assertEqual("common", faction_data.gameplay_items["bolter"]["rarity"])
+
+            # Still plain JSON for responses
+            self.assertEqual({"is_active": True}, json.loads(json.dumps(data.campaigns["testcampaign"])))
+
+    def test_outdated_bundle_not_used(self):
+        save_game_data_bundle(load_game_data(self.data_dir), self.bundle_path, self.data_dir)
+
+        # Levels rebuilt after the bundle, e.g. by level builder
+        self.write_json("levels.json", LEVELS + [{"xp_amount": 15000, "level": 4}])
+        self.assertIsNone(load_game_data_bundle(self.bundle_path, self.data_dir))
+        with self.assertRaises(ValueError):
+            verify_game_data_bundle(self.bundle_path, self.data_dir)
+        self.assertTupleEqual((0, 3000, 8000, 15000), load_game_data(self.data_dir).level_xp_amounts)
+
+        save_game_data_bundle(load_game_data(self.data_dir), self.bundle_path, self.data_dir)
+        self.assertTupleEqual((0, 3000, 8000, 15000),
+                              load_game_data_bundle(self.bundle_path, self.data_dir).level_xp_amounts)
+
+    def test_same_size_edit_fails_verification(self):
+        save_game_data_bundle(load_game_data(self.data_dir), self.bundle_path, self.data_dir)
+
+        # Only sizes are checked at cold start, content is checked before deploy
+        self.write_json("levels.json", [{**row, "xp_amount": row["xp_amount"] * 2} if row["level"] == 2 else row
+                                        for row in LEVELS])
+        self.assertIsNotNone(load_game_data_bundle(self.bundle_path, self.data_dir))
+        with self.assertRaises(ValueError):
+            verify_game_data_bundle(self.bundle_path, self.data_dir)
+
+    def test_missing_bundle(self):
+        self.assertIsNone(load_game_data_bundle(self.bundle_path, self.data_dir))
+        with self.assertRaises(ValueError):
+            verify_game_data_bundle(self.bundle_path, self.data_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import os
+import json
+import unittest
+
+from tools.rating import rate_match
+
+# Shared with matchmaking backend, so both TrueSkill implementations give the same ratings
+RATING_VECTORS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "ecr_matchmaking",
+                                   "backend", "tests", "rating_vectors.json")
+
+
+class TestRating(unittest.TestCase):
+    def test_shared_rating_vectors(self):
+        with open(RATING_VECTORS_PATH) as f:
+            matches = json.load(f)["matches"]
+
+        for match in matches:
+            with self.subTest(match["description"]):
+                new_ratings = rate_match({p: tuple(r) for p, r in match["winners"].items()},
+                                         {p: tuple(r) for p, r in match["losers"].items()})
+                self.assertSetEqual(set(match["expected"]), set(new_ratings))
+                for player, (expected_mu, expected_sigma) in match["expected"].items():
+                    mu, sigma = new_ratings[player]
+                    self.assertAlmostEqual(expected_mu, mu, places=9)
+                    self.assertAlmostEqual(expected_sigma, sigma, places=9)
+
+
+if __name__ == "__main__":
+    unittest.main()
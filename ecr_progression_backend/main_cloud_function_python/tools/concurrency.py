@@ -0,0 +1,48 @@
+import os
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads shared by all requests of function instance for independent YDB queries and S3 requests
+BACKEND_CALLS_MAX_WORKERS = int(os.getenv("BACKEND_CALLS_MAX_WORKERS", "32"))
+
+_executor = ThreadPoolExecutor(max_workers=BACKEND_CALLS_MAX_WORKERS, thread_name_prefix="backend_call")
+
+
+class ParallelCalls:
+    """Group of independent backend calls (YDB queries, S3 requests) of one request, run in shared thread pool,
+    so request waits for the longest call instead of the sum of them. Leaving the context waits for all calls,
+    so none of them outlives the request. Results (or exceptions) are taken from returned futures.
+
+    Calls must not use ParallelCalls themselves, as waiting for pool inside pool can exhaust it. Example:
+
+        with ParallelCalls() as calls:
+            query_future = calls.submit(self.yc.process_query, query, query_params)
+            data_future = calls.submit(self.s3.get_file_from_s3, path)
+        result, code = query_future.result()
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor = None):
+        self.executor = executor or _executor
+        self.futures = []
+
+    def submit(self, fn, *args, **kwargs) -> concurrent.futures.Future:
+        future = self.executor.submit(fn, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+    def map(self, fn, iterable) -> list:
+        """Submits fn for each element, returns list of futures in the same order"""
+        return [self.submit(fn, el) for el in iterable]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        concurrent.futures.wait(self.futures)
+        return False
+
+
+def submit_background(fn, *args, **kwargs) -> concurrent.futures.Future:
+    """Runs call in the shared thread pool without waiting for it, for calls the response doesn't depend on
+    (e.g. notifying other services). Function instance can be paused after response, so the call can finish later"""
+    return _executor.submit(fn, *args, **kwargs)
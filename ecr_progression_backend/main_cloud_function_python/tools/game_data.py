@@ -0,0 +1,237 @@
+import os
+import json
+import pickle
+import hashlib
+import logging
+import threading
+
+from tools.common_schemas import ECR_FACTIONS
+
+GAME_DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+# Compiled by scripts/game_data_builder.py together with JSON files, used instead of them if present
+GAME_DATA_BUNDLE_PATH = os.path.join(GAME_DATA_DIR, "game_data.pickle")
+GAME_DATA_BUNDLE_FORMAT = 4
+
+logger = logging.getLogger(__name__)
+
+
+def _read_json(path, default=None):
+    if default is not None and not os.path.exists(path):
+        logger.warning(f"Game data file {path} doesn't exist")
+        return default
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_game_data_files(data_dir=GAME_DATA_DIR):
+    """Paths of game data JSON files by faction (None for common files) and data name"""
+    files = {}
+    for faction in ECR_FACTIONS:
+        faction_name = faction.lower()
+        files[faction] = {
+            "gameplay_items": os.path.join(data_dir, f"gameplay_items/gameplay_items_{faction_name}.json"),
+            "cosmetic_items": os.path.join(data_dir, f"cosmetic_items/cosmetic_items_{faction_name}.json"),
+            "advancements": os.path.join(data_dir, f"advancements/advancements_{faction_name}.json"),
+            "quests": os.path.join(data_dir, f"quests/quests_{faction_name}.json"),
+            "lootboxes": os.path.join(data_dir, f"lootboxes/lootboxes_{faction_name}.json")
+        }
+    files[None] = {
+        "campaigns": os.path.join(data_dir, "campaigns/campaigns.json"),
+        "missions": os.path.join(data_dir, "missions/missions.json"),
+        "dailies": os.path.join(data_dir, "dailies/dailies.json"),
+        "levels": os.path.join(data_dir, "levels.json")
+    }
+    return files
+
+
+def get_source_hash(data_dir=GAME_DATA_DIR):
+    """Hash of game data JSON files as they are on disk, changes if any of them is rebuilt or edited after bundle.
+    Reads all of them, so it's checked at deploy, not at cold start"""
+    h = hashlib.sha256()
+    for faction, faction_files in get_game_data_files(data_dir).items():
+        for name, path in faction_files.items():
+            h.update(f"{faction}:{name}:".encode("utf-8"))
+            try:
+                with open(path, "rb") as f:
+                    h.update(hashlib.sha256(f.read()).digest())
+            except FileNotFoundError:
+                h.update(b"missing")
+    return h.hexdigest()
+
+
+def get_source_sizes(data_dir=GAME_DATA_DIR):
+    """Sizes of game data JSON files (None if missing), cheap check at cold start that they weren't rebuilt after
+    bundle, without reading them"""
+    sizes = {}
+    for faction, faction_files in get_game_data_files(data_dir).items():
+        for name, path in faction_files.items():
+            try:
+                sizes[f"{faction}:{name}"] = os.stat(path).st_size
+            except FileNotFoundError:
+                sizes[f"{faction}:{name}"] = None
+    return sizes
+
+
+class FrozenDict(dict):
+    """Read-only dict. Stays a dict, so game data pieces can still be dumped to JSON or passed to schemas"""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Game data is read-only")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        # Default dict subclass pickling fills the object with __setitem__
+        return FrozenDict, (dict(self),)
+
+
+def freeze(data):
+    """Recursively converts dicts to FrozenDict and lists to tuples, so nested item, quest or lootbox data shared
+    by all requests of an instance can't be modified by one of them"""
+    if isinstance(data, dict):
+        return FrozenDict({k: freeze(v) for k, v in data.items()})
+    elif isinstance(data, (list, tuple)):
+        return tuple(freeze(v) for v in data)
+    return data
+
+
+class FactionGameData:
+    """Progression data of one faction (gameplay items, cosmetic items, advancements, quests, lootboxes)
+    indexed by lowercase id"""
+
+    def __init__(self, gameplay_items: dict, cosmetic_items: dict, advancements: dict, quests: dict,
+                 lootboxes: dict):
+        self.gameplay_items = freeze(gameplay_items)
+        self.cosmetic_items = freeze(cosmetic_items)
+        self.advancements = freeze(advancements)
+        self.quests = freeze(quests)
+        self.lootboxes = freeze(lootboxes)
+
+        # Items that can be won from lootboxes by rarity, so opening a lootbox doesn't scan all items
+        self.lootbox_gameplay_items = self._get_lootbox_items_by_rarity(self.gameplay_items)
+        self.lootbox_cosmetic_items = self._get_lootbox_items_by_rarity(self.cosmetic_items)
+
+        self.titles = tuple(quest_data["reward_title"] for quest_data in self.quests.values()
+                            if quest_data["reward_title"])
+
+    @staticmethod
+    def _get_lootbox_items_by_rarity(items: dict):
+        rarity_to_items = {}
+        for item, item_data in items.items():
+            if item_data["is_lootbox_granted"] and item_data["is_enabled"]:
+                rarity_to_items.setdefault(item_data["rarity"], []).append((item, item_data))
+        return FrozenDict({rarity: tuple(rarity_items) for rarity, rarity_items in rarity_to_items.items()})
+
+
+class GameData:
+    """Static game data built by scripts/game_data_builder.py. Loaded once per function instance and shared by
+    all resource processors, so it must not be modified"""
+
+    def __init__(self, campaigns: dict, missions: dict, dailies: dict, levels: list, factions: dict,
+                 content_hash: str = None):
+        self.campaigns = freeze(campaigns)
+        self.missions = freeze(missions)
+        self.dailies = freeze(dailies)
+        self.levels = freeze(levels)
+        self.factions = FrozenDict({faction.lower(): data for faction, data in factions.items()})
+        self.content_hash = content_hash
+
+        # Ordered XP thresholds of levels for binary search
+        self.level_xp_amounts = tuple(row["xp_amount"] for row in self.levels)
+        self.all_quest_names = frozenset(quest for data in self.factions.values() for quest in data.quests)
+
+    def get_faction_data(self, faction: str):
+        """Returns FactionGameData for given faction or None if there is no data for it"""
+        return self.factions.get(faction.lower())
+
+
+def get_content_hash(raw_data: dict):
+    """Hash of game data content, same for same data regardless of JSON formatting"""
+    return hashlib.sha256(json.dumps(raw_data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def load_game_data(data_dir=GAME_DATA_DIR):
+    """Reads game data JSON files into GameData"""
+
+    files = get_game_data_files(data_dir)
+    raw_factions = {
+        faction: {name: _read_json(path, {}) for name, path in files[faction].items()} for faction in ECR_FACTIONS
+    }
+
+    raw_data = {name: _read_json(path) for name, path in files[None].items()}
+    raw_data["factions"] = raw_factions
+    content_hash = get_content_hash(raw_data)
+
+    factions = {faction: FactionGameData(**faction_data) for faction, faction_data in raw_factions.items()}
+    return GameData(raw_data["campaigns"], raw_data["missions"], raw_data["dailies"], raw_data["levels"], factions,
+                    content_hash)
+
+
+def save_game_data_bundle(game_data: GameData, bundle_path=GAME_DATA_BUNDLE_PATH, data_dir=GAME_DATA_DIR):
+    """Saves indexed game data to one compact file, which is loaded without parsing and indexing. Hash and sizes
+    of JSON files in data_dir are saved with it, so the bundle isn't used if they change later"""
+    with open(bundle_path, "wb") as f:
+        pickle.dump({"format": GAME_DATA_BUNDLE_FORMAT, "content_hash": game_data.content_hash,
+                     "source_hash": get_source_hash(data_dir), "source_sizes": get_source_sizes(data_dir),
+                     "game_data": game_data}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _read_game_data_bundle(bundle_path):
+    with open(bundle_path, "rb") as f:
+        bundle = pickle.load(f)
+
+    if bundle.get("format") != GAME_DATA_BUNDLE_FORMAT:
+        raise ValueError(f"Game data bundle {bundle_path} has format {bundle.get('format')}, "
+                         f"expected {GAME_DATA_BUNDLE_FORMAT}")
+    return bundle
+
+
+def load_game_data_bundle(bundle_path=GAME_DATA_BUNDLE_PATH, data_dir=GAME_DATA_DIR):
+    """Loads game data saved by save_game_data_bundle, returns None if there is no usable bundle or sizes of JSON
+    files in data_dir changed since it was saved. Content of JSON files is checked by verify_game_data_bundle"""
+    try:
+        bundle = _read_game_data_bundle(bundle_path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Couldn't load game data bundle {bundle_path}: {e}")
+        return None
+
+    if bundle["source_sizes"] != get_source_sizes(data_dir):
+        logger.warning(f"Game data bundle {bundle_path} is outdated, JSON files changed after it was built, "
+                       f"run scripts/game_data_builder.py to rebuild it")
+        return None
+    return bundle["game_data"]
+
+
+def verify_game_data_bundle(bundle_path=GAME_DATA_BUNDLE_PATH, data_dir=GAME_DATA_DIR):
+    """Raises ValueError if bundle is absent or wasn't built from current JSON files in data_dir"""
+    try:
+        bundle = _read_game_data_bundle(bundle_path)
+    except FileNotFoundError:
+        raise ValueError(f"Game data bundle {bundle_path} doesn't exist, run scripts/game_data_builder.py")
+
+    if bundle["source_hash"] != get_source_hash(data_dir):
+        raise ValueError(f"Game data bundle {bundle_path} is outdated, JSON files changed after it was built, "
+                         f"run scripts/game_data_builder.py to rebuild it")
+
+
+_game_data = None
+_game_data_lock = threading.Lock()
+
+
+def get_game_data():
+    """Returns game data of this function instance, loading it on first use (from bundle if it's present)"""
+
+    global _game_data
+    if _game_data is None:
+        with _game_data_lock:
+            if _game_data is None:
+                game_data = load_game_data_bundle()
+                if game_data is None:
+                    game_data = load_game_data()
+                logger.info(f"Loaded game data {game_data.content_hash}")
+                _game_data = game_data
+    return _game_data
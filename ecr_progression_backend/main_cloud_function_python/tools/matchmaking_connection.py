@@ -0,0 +1,40 @@
+import os
+import logging
+import traceback
+
+import requests
+
+logger = logging.getLogger('Matchmaking')
+
+MAX_RATINGS_PER_REQUEST = 200  # Same limit as matchmaking backend accepts in one request
+
+
+def push_player_ratings(ratings):
+    """Sends updated ratings (player id to (mu, sigma)) to matchmaking backend cache, up to MAX_RATINGS_PER_REQUEST
+    ratings in one request"""
+    matchmaking_url = os.getenv("MATCHMAKING_URL")
+    matchmaking_api_key = os.getenv("MATCHMAKING_API_KEY")
+
+    if not matchmaking_url:
+        logger.warning("Env variable MATCHMAKING_URL not set, ratings not pushed to matchmaking")
+        return
+
+    if not matchmaking_api_key:
+        logger.warning("Env variable MATCHMAKING_API_KEY not set, ratings not pushed to matchmaking")
+        return
+
+    try:
+        player_ratings = [
+            {"player_id": str(player_id), "mu": mu, "sigma": sigma}
+            for player_id, (mu, sigma) in ratings.items()
+        ]
+        for i in range(0, len(player_ratings), MAX_RATINGS_PER_REQUEST):
+            payload = {"ratings": player_ratings[i:i + MAX_RATINGS_PER_REQUEST]}
+            response = requests.post(f"{matchmaking_url}/update_player_ratings", json=payload, timeout=2,
+                                     headers={"Authorization": f"Api-Key {matchmaking_api_key}"})
+            if response.status_code != 200:
+                raise ValueError(f"Matchmaking Error {response.status_code}: {response.text}")
+    except Exception as e:
+        # Ratings are stored in YDB anyway, matchmaking just uses default rating for these players until next match
+        logger.error(f"Matchmaking Error {e}")
+        logger.error(traceback.format_exc())
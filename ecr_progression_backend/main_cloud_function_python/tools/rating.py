@@ -0,0 +1,60 @@
+import math
+from statistics import NormalDist
+
+# TrueSkill environment, must be the same as in matchmaking backend (logic/ranking.py)
+MU = 25.0  # Initial mean of player skill
+SIGMA = MU / 3  # Initial deviation of player skill
+BETA = SIGMA / 2  # Skill difference that gives ~76% chance to win
+TAU = SIGMA / 100  # Dynamics factor, keeps deviation from reaching zero
+DRAW_PROBABILITY = 0.10
+
+_normal = NormalDist()
+_draw_margin_factor = _normal.inv_cdf((DRAW_PROBABILITY + 1) / 2) * BETA
+
+
+def _cdf(x):
+    # Through erfc, as 1 + erf of NormalDist.cdf loses precision when winner was expected to lose badly
+    return 0.5 * math.erfc(-x / math.sqrt(2))
+
+
+def _v_win(x, eps):
+    """Mean additive correction of truncated gaussian for win"""
+    x = x - eps
+    denom = _cdf(x)
+    # When the winner was expected to lose badly, the correction tends to -x
+    if denom <= 1e-300:
+        return -x
+    return _normal.pdf(x) / denom
+
+
+def _w_win(x, eps):
+    """Variance multiplicative correction of truncated gaussian for win"""
+    v = _v_win(x, eps)
+    return min(max(v * (v + x - eps), 0), 1)
+
+
+def rate_match(winners: dict, losers: dict) -> dict:
+    """Updates skills of all participants of a 2-team match with a winner.
+
+    :param winners: player id to (mu, sigma) for winning team
+    :param losers: player id to (mu, sigma) for losing team
+    :return: player id to new (mu, sigma) for all participants
+    """
+    # Skill may have changed since the last match
+    sigmas_sq = {player: sigma ** 2 + TAU ** 2 for player, (_, sigma) in {**winners, **losers}.items()}
+
+    players_amount = len(winners) + len(losers)
+    c_sq = sum(sigmas_sq.values()) + players_amount * BETA ** 2
+    c = math.sqrt(c_sq)
+    mu_diff = sum(mu for mu, _ in winners.values()) - sum(mu for mu, _ in losers.values())
+    eps = _draw_margin_factor * math.sqrt(players_amount) / c
+
+    v = _v_win(mu_diff / c, eps)
+    w = _w_win(mu_diff / c, eps)
+
+    new_ratings = {}
+    for team, sign in ((winners, 1), (losers, -1)):
+        for player, (mu, _) in team.items():
+            sigma_sq = sigmas_sq[player]
+            new_ratings[player] = (mu + sign * sigma_sq / c * v, math.sqrt(sigma_sq * (1 - sigma_sq / c_sq * w)))
+    return new_ratings
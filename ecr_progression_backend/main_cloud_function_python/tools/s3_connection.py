@@ -22,6 +22,16 @@ class S3Connector:
         content = obj_response['Body'].read()
         return content
 
+    def get_file_from_s3_or_default(self, s3_key, default=None):
+        """Gets file content with one request, returns default if there is no such file"""
+        try:
+            return self.get_file_from_s3(s3_key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ("NoSuchKey", "404"):
+                return default
+            else:
+                raise e
+
     def upload_file_to_s3(self, content, s3_key):
         self.s3.put_object(Bucket=self.bucket_name, Key=s3_key, Body=content)
 
@@ -4,6 +4,9 @@ import traceback
 
 import ydb
 
+# Sessions kept by function instance, allows running queries from parallel calls of requests at the same time
+YDB_SESSION_POOL_SIZE = int(os.getenv("YDB_SESSION_POOL_SIZE", "8"))
+
 
 class YDBConnector:
     def __init__(self, logger):
@@ -21,7 +24,7 @@ class YDBConnector:
 
         self.driver = ydb.Driver(self.driver_config)
         self.driver.wait(fail_fast=True, timeout=10)
-        self.pool = ydb.SessionPool(self.driver, size=1)
+        self.pool = ydb.SessionPool(self.driver, size=YDB_SESSION_POOL_SIZE)
 
     @staticmethod
     def __execute_query(session, query, query_params):
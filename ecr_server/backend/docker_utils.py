@@ -21,7 +21,9 @@ DEFAULT_FREE_INSTANCES = list(range(0, MAX_GAME_SERVER_INSTANCES))
 
 
 async def launch_game_docker(region, game_contour, game_version, game_map, game_mode, game_mission, instance_number,
-                             resource_units, match_id, faction_setup, max_team_size):
+                             resource_units, match_id, faction_setup, max_team_size, is_stopped=None):
+    """Runs game server container for match until it exits. is_stopped is checked after container is created, as stop
+    request could come while it was being created and not find it"""
     port_base = 7777
     port = port_base + instance_number
     log_file = f"{match_id}.log"
@@ -64,6 +66,10 @@ async def launch_game_docker(region, game_contour, game_version, game_map, game_
             },
             name=f"ecr-gameserver-{match_id}"
         )
+        if is_stopped is not None and await is_stopped():
+            logger.debug(f"Match id {match_id} was stopped while launching, removing its container")
+            await stop_game_docker(match_id)
+            return
         stats = await monitor_container(container, match_id)
 
         # Letting matchmaking know about free resources and game server resource stats
@@ -106,6 +112,21 @@ async def launch_game_docker(region, game_contour, game_version, game_map, game_
                 log_content = f.read()
             await s3.upload_file_to_s3(log_content, s3_log_key)
 
+async def stop_game_docker(match_id):
+    """Removes container of match if it exists, returns whether it existed"""
+    async with aiodocker.Docker() as docker_client:
+        try:
+            container = await docker_client.containers.get(f"ecr-gameserver-{match_id}")
+            logger.debug(f"Stopping container with match id {match_id}")
+            await container.delete(force=True)
+        except aiodocker.DockerError as e:
+            # Doesn't exist or was removed at the same time by launch task
+            if e.status == 404:
+                return False
+            raise e
+        return True
+
+
 async def monitor_container(container, match_id):
     stats = {}
     try:
@@ -130,7 +151,12 @@ async def monitor_container(container, match_id):
     finally:
         if os.getenv("DO_DELETE_CONTAINERS", None) == "1":
             logger.debug(f"Removing container with match id {match_id}")
-            await container.delete(force=True)
+            try:
+                await container.delete(force=True)
+            except aiodocker.DockerError as e:
+                # Already removed by stop request
+                if e.status != 404:
+                    raise e
     return stats
 
 
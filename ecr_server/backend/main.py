@@ -9,8 +9,8 @@ import httpx
 from fastapi import FastAPI, BackgroundTasks, HTTPException
 from aiocache import SimpleMemoryCache
 
-from models import StartServerRequest, DownloadUpdateRequest
-from docker_utils import launch_game_docker, get_free_instances_and_units, pull_image_and_delete_older
+from models import StartServerRequest, StopServerRequest, DownloadUpdateRequest
+from docker_utils import launch_game_docker, stop_game_docker, get_free_instances_and_units, pull_image_and_delete_older
 
 app = FastAPI()
 
@@ -27,6 +27,8 @@ logger.setLevel(logging.DEBUG)
 
 cache_lock = asyncio.Lock()
 
+STOPPED_MATCH_EXPIRATION = 600  # Stopped match id is remembered for 10 minutes, so its late launch is skipped
+
 
 async def get_region():
     """Tries to get region data from cache, if not present, fetches regional API"""
@@ -54,8 +56,14 @@ async def launch_server_task(region, game_contour, game_version, game_map, game_
     logger.debug(f"Launching server version {game_version}:{game_contour} with instance {instance_number}, "
                  f"match id {match_id}, map {game_map}, mode {game_mode}, mission {game_mission}, "
                  f"factions {faction_setup}")
+    async def is_stopped():
+        return bool(await cache.get(f"stopped:{match_id}"))
+
+    if await is_stopped():
+        logger.debug(f"Match id {match_id} was stopped before launch, skipping it")
+        return
     await launch_game_docker(region, game_contour, game_version, game_map, game_mode, game_mission, instance_number,
-                             resource_units, match_id, faction_setup, max_team_size)
+                             resource_units, match_id, faction_setup, max_team_size, is_stopped=is_stopped)
 
 
 @app.post("/launch")
@@ -90,6 +98,16 @@ async def launch_game_server(body: StartServerRequest, background_tasks: Backgro
     }
 
 
+@app.post("/stop")
+async def stop_game_server(body: StopServerRequest):
+    """Stops instance launched for match, used by matchmaking when launch was also acknowledged by another server"""
+    # Stop may come before the instance is created by background task, which checks this flag before and after
+    # creating it, so the instance is removed either here or there
+    await cache.set(f"stopped:{body.match_unique_id}", True, ttl=STOPPED_MATCH_EXPIRATION)
+    stopped = await stop_game_docker(body.match_unique_id)
+    return {"acknowledged": True, "stopped": stopped}
+
+
 @app.post("/check_free_spots")
 async def check_free_spots():
     async with cache_lock:
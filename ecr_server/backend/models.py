@@ -14,6 +14,10 @@ class StartServerRequest(BaseModel):
     faction_setup: str
     max_team_size: int
 
+# Pydantic model for the request body
+class StopServerRequest(BaseModel):
+    match_unique_id: str
+
 # Pydantic model for the request body
 class DownloadUpdateRequest(BaseModel):
     new_image: str